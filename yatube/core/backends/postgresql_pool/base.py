@@ -0,0 +1,79 @@
+"""PostgreSQL с пулом соединений внутри процесса.
+
+Закрытие соединения Django возвращает его в пул, а новое берётся
+из пула, поэтому запросу не нужно заново устанавливать соединение.
+Размер пула задаётся ключом POOL в настройках базы:
+
+    'POOL': {'MIN_SIZE': 2, 'MAX_SIZE': 20, 'TIMEOUT': 10}
+
+MIN_SIZE соединений держится открытыми, остальные закрываются при
+возврате. Если все MAX_SIZE соединений заняты, поток ждёт TIMEOUT
+секунд. CONN_MAX_AGE с пулом лучше оставить равным 0. Драйвер
+psycopg2 ставится из requirements-postgresql.txt.
+"""
+import threading
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.postgresql import base
+
+try:
+    from psycopg2.pool import ThreadedConnectionPool
+except ImportError as error:
+    raise ImproperlyConfigured(f'Error loading psycopg2 module: {error}')
+
+DEFAULT_POOL = {'MIN_SIZE': 1, 'MAX_SIZE': 10, 'TIMEOUT': 10}
+
+
+class Pool:
+    def __init__(self, conn_params, min_size, max_size, timeout):
+        self.connections = ThreadedConnectionPool(
+            min_size, max_size, **conn_params)
+        self.slots = threading.BoundedSemaphore(max_size)
+        self.timeout = timeout
+
+    def get(self):
+        if not self.slots.acquire(timeout=self.timeout):
+            raise base.Database.OperationalError(
+                'Connection pool is exhausted')
+        try:
+            return self.connections.getconn()
+        except Exception:
+            self.slots.release()
+            raise
+
+    def put(self, connection):
+        try:
+            self.connections.putconn(connection, close=connection.closed)
+        finally:
+            self.slots.release()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    _pools = {}
+    _pools_lock = threading.Lock()
+
+    def _pool(self, conn_params):
+        with self._pools_lock:
+            pool = self._pools.get(self.alias)
+            if pool is None:
+                options = {**DEFAULT_POOL,
+                           **self.settings_dict.get('POOL', {})}
+                pool = self._pools[self.alias] = Pool(
+                    conn_params, options['MIN_SIZE'], options['MAX_SIZE'],
+                    options['TIMEOUT'])
+        return pool
+
+    def get_new_connection(self, conn_params):
+        connection = self._pool(conn_params).get()
+        options = self.settings_dict['OPTIONS']
+        self.isolation_level = options.get(
+            'isolation_level', connection.isolation_level)
+        if self.isolation_level != connection.isolation_level:
+            connection.set_session(isolation_level=self.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                # незавершённую транзакцию откатит сам пул
+                self._pools[self.alias].put(self.connection)
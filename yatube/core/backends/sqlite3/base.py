@@ -0,0 +1,18 @@
+"""SQLite, в котором транзакции сразу берут блокировку записи.
+
+Обычный BEGIN откладывает блокировку до первой записи. Если к этому
+моменту другой поток уже записал данные, SQLite сразу отвечает
+database is locked, не дожидаясь busy_timeout. BEGIN IMMEDIATE
+ставит писателей в очередь в самом начале транзакции.
+"""
+from django.db.backends.sqlite3 import base
+
+from core import signals
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def _start_transaction_under_autocommit(self):
+        if signals.tuning_enabled:
+            self.cursor().execute('BEGIN IMMEDIATE')
+        else:
+            super()._start_transaction_under_autocommit()
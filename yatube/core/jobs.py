@@ -0,0 +1,174 @@
+"""Очередь фоновых задач в таблице базы.
+
+Задача ставится в той же транзакции, что и породившая её запись:
+откат отменяет и задачу, а воркер не увидит её до коммита. Команда
+run_jobs забирает готовые задачи, выполняет их в пуле потоков и при
+ошибке повторяет с экспоненциальной задержкой. Ключ идемпотентности
+не даёт поставить одну и ту же задачу дважды.
+
+Задачи регистрируются декоратором task под именем, по которому их
+ставит enqueue:
+
+    @jobs.task('posts.thumbnails')
+    def make_thumbnails(post_id):
+        ...
+
+    jobs.enqueue('posts.thumbnails', post.pk, key=f'thumbnails:{post.pk}')
+"""
+import json
+import logging
+import random
+import uuid
+from datetime import timedelta
+
+from django.db import close_old_connections
+from django.db.models import Count, F
+from django.utils import timezone
+
+from yatube.settings import (JOB_BACKOFF_MAX_SECONDS, JOB_BACKOFF_SECONDS,
+                             JOB_MAX_ATTEMPTS, JOB_RETENTION_DAYS,
+                             JOB_TIMEOUT_SECONDS)
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# по скольким последним выполненным задачам считать задержку
+LATENCY_SAMPLE = 1000
+
+REGISTRY = {}
+
+
+def task(name):
+    """Регистрирует функцию как задачу очереди."""
+    def decorator(func):
+        REGISTRY[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, *args, key=None, delay=0, max_attempts=JOB_MAX_ATTEMPTS):
+    """Ставит задачу в очередь; с занятым key возвращает старую.
+
+    Упавшая (failed) задача с тем же key ставится в очередь заново.
+    """
+    if name not in REGISTRY:
+        raise LookupError(f'Неизвестная задача {name}')
+    fields = {
+        'name': name,
+        'args': json.dumps(args),
+        'max_attempts': max_attempts,
+        'run_at': timezone.now() + timedelta(seconds=delay),
+    }
+    if key is None:
+        return Job.objects.create(**fields)
+    job, created = Job.objects.get_or_create(key=key, defaults=fields)
+    if not created and job.status == Job.FAILED:
+        Job.objects.filter(pk=job.pk, status=Job.FAILED).update(
+            status=Job.QUEUED, attempts=0, error='', worker='',
+            started=None, finished=None, **fields)
+        job.refresh_from_db()
+    return job
+
+
+def backoff(attempt):
+    """Задержка перед повтором: удваивается, со случайным разбросом."""
+    delay = min(JOB_BACKOFF_SECONDS * 2 ** (attempt - 1),
+                JOB_BACKOFF_MAX_SECONDS)
+    return timedelta(seconds=delay * random.uniform(0.5, 1))
+
+
+def claim(limit):
+    """Забирает до limit готовых задач.
+
+    Задача переходит в running условным UPDATE, поэтому её не заберут
+    два воркера, даже в разных процессах.
+    """
+    now = timezone.now()
+    ids = list(
+        Job.objects.filter(status=Job.QUEUED, run_at__lte=now)
+        .order_by('run_at').values_list('pk', flat=True)[:limit]
+    )
+    if not ids:
+        return []
+    worker = uuid.uuid4().hex
+    Job.objects.filter(pk__in=ids, status=Job.QUEUED).update(
+        status=Job.RUNNING, worker=worker, started=now,
+        attempts=F('attempts') + 1)
+    return list(Job.objects.filter(pk__in=ids, worker=worker,
+                                   status=Job.RUNNING))
+
+
+def _finish(job, **fields):
+    Job.objects.filter(pk=job.pk, worker=job.worker).update(**fields)
+
+
+def run(job):
+    """Выполняет забранную задачу и записывает результат."""
+    try:
+        func = REGISTRY.get(job.name)
+        if func is None:
+            raise LookupError(f'Неизвестная задача {job.name}')
+        func(*json.loads(job.args))
+    except Exception as error:
+        logger.exception('Задача %s упала (попытка %s из %s)',
+                         job, job.attempts, job.max_attempts)
+        now = timezone.now()
+        if job.attempts >= job.max_attempts:
+            _finish(job, status=Job.FAILED, finished=now, error=repr(error))
+        else:
+            _finish(job, status=Job.QUEUED, error=repr(error),
+                    run_at=now + backoff(job.attempts))
+    else:
+        _finish(job, status=Job.DONE, finished=timezone.now(), error='')
+    finally:
+        close_old_connections()
+
+
+def requeue_stale():
+    """Возвращает в очередь задачи, чей воркер пропал."""
+    now = timezone.now()
+    stale = Job.objects.filter(
+        status=Job.RUNNING,
+        started__lt=now - timedelta(seconds=JOB_TIMEOUT_SECONDS))
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, finished=now, error='Превышено время выполнения')
+    return failed + stale.update(status=Job.QUEUED, run_at=now)
+
+
+def prune(days=JOB_RETENTION_DAYS):
+    """Удаляет давно выполненные задачи."""
+    return Job.objects.filter(
+        status=Job.DONE,
+        finished__lt=timezone.now() - timedelta(days=days),
+    ).delete()[0]
+
+
+def stats():
+    """Глубина очереди и задержка задач от постановки до выполнения."""
+    now = timezone.now()
+    counts = dict.fromkeys(dict(Job.STATUSES), 0)
+    counts.update(Job.objects.order_by().values_list('status')
+                  .annotate(total=Count('pk')))
+    oldest = (Job.objects.filter(status=Job.QUEUED, run_at__lte=now)
+              .order_by('run_at').values_list('run_at', flat=True).first())
+    latencies = sorted(
+        (finished - created).total_seconds()
+        for created, finished in
+        Job.objects.filter(status=Job.DONE).order_by('-finished')
+        .values_list('created', 'finished')[:LATENCY_SAMPLE]
+    )
+
+    def percentile(share):
+        if not latencies:
+            return 0.0
+        return 1000 * latencies[min(int(share * len(latencies)),
+                                    len(latencies) - 1)]
+
+    return {
+        **counts,
+        'oldest_queued_seconds': (
+            (now - oldest).total_seconds() if oldest else 0.0),
+        'latency_p50_ms': percentile(0.5),
+        'latency_p95_ms': percentile(0.95),
+    }
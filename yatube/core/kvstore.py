@@ -0,0 +1,129 @@
+"""Общее для всех процессов key-value хранилище в файле SQLite.
+
+Хранилище переживает перезапуски и читается всеми воркерами
+одновременно (WAL), поэтому метаданные миниатюр не приходится
+заново находить в каждом процессе.
+"""
+import sqlite3
+import threading
+
+from django.conf import settings
+from sorl.thumbnail.kvstores.base import KVStoreBase
+
+# ограничение SQLite на число параметров в запросе
+CHUNK_SIZE = 500
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS kv ('
+    ' key TEXT PRIMARY KEY, value TEXT NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS metrics ('
+    ' name TEXT PRIMARY KEY, value REAL NOT NULL DEFAULT 0)',
+)
+
+
+def _chunks(items):
+    items = list(items)
+    for start in range(0, len(items), CHUNK_SIZE):
+        yield items[start:start + CHUNK_SIZE]
+
+
+class SQLiteStore:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    @property
+    def connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self.path, timeout=30, isolation_level=None,
+                check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                connection.execute(statement)
+            self._local.connection = connection
+        return connection
+
+    def get(self, key):
+        row = self.connection.execute(
+            'SELECT value FROM kv WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def get_many(self, keys):
+        found = {}
+        for chunk in _chunks(keys):
+            placeholders = ', '.join('?' * len(chunk))
+            found.update(self.connection.execute(
+                f'SELECT key, value FROM kv WHERE key IN ({placeholders})',
+                chunk))
+        return found
+
+    def set_many(self, mapping):
+        with self.connection:
+            self.connection.execute('BEGIN')
+            self.connection.executemany(
+                'INSERT INTO kv (key, value) VALUES (?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET value = excluded.value',
+                mapping.items())
+
+    def delete_many(self, keys):
+        for chunk in _chunks(keys):
+            placeholders = ', '.join('?' * len(chunk))
+            self.connection.execute(
+                f'DELETE FROM kv WHERE key IN ({placeholders})', chunk)
+
+    def keys(self, prefix):
+        return [row[0] for row in self.connection.execute(
+            'SELECT key FROM kv WHERE substr(key, 1, ?) = ?',
+            (len(prefix), prefix))]
+
+    def add_metrics(self, mapping):
+        """Прибавляет значения к накопительным метрикам."""
+        with self.connection:
+            self.connection.execute('BEGIN')
+            self.connection.executemany(
+                'INSERT INTO metrics (name, value) VALUES (?, ?) '
+                'ON CONFLICT(name) DO UPDATE '
+                'SET value = value + excluded.value',
+                mapping.items())
+
+    def metrics(self):
+        return dict(self.connection.execute(
+            'SELECT name, value FROM metrics'))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SQLiteStore(settings.THUMBNAIL_KVSTORE_PATH)
+    return _store
+
+
+def reset():
+    """Забывает хранилище: следующий store() заново прочитает путь."""
+    global _store
+    with _store_lock:
+        _store = None
+
+
+class ThumbnailKVStore(KVStoreBase):
+    """KV-хранилище sorl-thumbnail поверх общего файла SQLite."""
+
+    def _get_raw(self, key):
+        return store().get(key)
+
+    def _set_raw(self, key, value):
+        store().set_many({key: value})
+
+    def _delete_raw(self, *keys):
+        store().delete_many(keys)
+
+    def _find_keys_raw(self, prefix):
+        return store().keys(prefix)
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from core import jobs
+
+
+class Command(BaseCommand):
+    help = 'Показывает глубину очереди задач и задержку их выполнения'
+
+    def handle(self, *args, **options):
+        stats = jobs.stats()
+        self.stdout.write(
+            f'queued: {stats["queued"]}, running: {stats["running"]}, '
+            f'failed: {stats["failed"]}, done: {stats["done"]}\n'
+            f'oldest queued: {stats["oldest_queued_seconds"]:.1f} s\n'
+            f'latency p50: {stats["latency_p50_ms"]:.1f} ms, '
+            f'p95: {stats["latency_p95_ms"]:.1f} ms'
+        )
@@ -0,0 +1,49 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from yatube.settings import JOB_POLL_SECONDS, JOB_WORKERS
+
+from core import jobs
+
+# как часто воркер возвращает потерянные задачи и чистит старые
+MAINTENANCE_SECONDS = 60
+
+
+class Command(BaseCommand):
+    help = ('Выполняет фоновые задачи core.jobs в пуле потоков. Воркеров '
+            'можно запускать несколько: задачу забирает только один')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=JOB_WORKERS)
+        parser.add_argument('--poll', type=float, default=JOB_POLL_SECONDS,
+                            help='Пауза, когда очередь пуста, в секундах')
+        parser.add_argument('--once', action='store_true',
+                            help='Разобрать готовые задачи и выйти')
+
+    def handle(self, *args, **options):
+        done = 0
+        maintained = None
+        with ThreadPoolExecutor(options['workers']) as pool:
+            # общую базу в памяти (тесты) второй поток застаёт
+            # заблокированной
+            run = map if connection.is_in_memory_db() else pool.map
+            try:
+                while True:
+                    if (maintained is None or time.monotonic() - maintained
+                            > MAINTENANCE_SECONDS):
+                        jobs.requeue_stale()
+                        jobs.prune()
+                        maintained = time.monotonic()
+                    batch = jobs.claim(options['workers'])
+                    done += len(list(run(jobs.run, batch)))
+                    if batch:
+                        continue
+                    if options['once']:
+                        break
+                    time.sleep(options['poll'])
+            except KeyboardInterrupt:
+                pass
+        self.stdout.write(self.style.SUCCESS(f'Выполнено задач: {done}'))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from yatube.settings import DATABASE_REPLICAS
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу SQLite в файлы реплик: локальная '
+            'замена репликации для проверки core.routers')
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError(
+                'Реплики PostgreSQL наполняет репликация самой базы')
+        if not DATABASE_REPLICAS:
+            raise CommandError('Реплики не настроены: задайте DB_REPLICAS')
+        primary.ensure_connection()
+        for alias in DATABASE_REPLICAS:
+            replica = connections[alias]
+            replica.ensure_connection()
+            primary.connection.backup(replica.connection)
+            self.stdout.write(f'{alias}: {replica.settings_dict["NAME"]}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Синхронизировано реплик: {len(DATABASE_REPLICAS)}'))
@@ -0,0 +1,198 @@
+"""Профилирование запросов: SQL, шаблоны и кэш.
+
+Каждый PROFILING_SAMPLE_RATE-й по вероятности запрос получает
+заголовок Server-Timing и строку JSON в логгере core.profiling.
+При DEBUG параметр ?_profile=1 профилирует запрос принудительно и
+вместо страницы отдаёт отчёт в JSON.
+"""
+import contextvars
+import json
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.http import JsonResponse
+from django.template.backends.django import Template
+
+from yatube.settings import REPLICA_PIN_SECONDS
+
+from . import routers
+
+logger = logging.getLogger('core.profiling')
+
+REPORT_PARAM = '_profile'
+# cookie, закрепляющая пользователя за основной базой после записи
+PIN_COOKIE = 'pin_primary'
+# сколько самых частых повторов SQL показывать
+TOP_DUPLICATES = 5
+
+NUMBER = re.compile(r'\b\d+\b')
+STRING = re.compile(r"'(?:[^']|'')*'")
+PLACEHOLDERS = re.compile(r'\((?:%s, )+%s\)')
+
+_current = contextvars.ContextVar('profile', default=None)
+
+
+def fingerprint(sql):
+    """SQL без значений: запросы, отличающиеся только ими, совпадают."""
+    sql = STRING.sub('?', sql)
+    sql = NUMBER.sub('?', sql)
+    return PLACEHOLDERS.sub('(...)', sql)
+
+
+class Profile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = Counter()
+        self.query_seconds = 0.0
+        self.render_seconds = 0.0
+        self.renders = 0
+        self.render_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_seconds += time.perf_counter() - started
+            self.queries[fingerprint(sql)] += 1
+
+    def report(self):
+        duplicates = [
+            {'sql': sql, 'count': count}
+            for sql, count in self.queries.most_common(TOP_DUPLICATES)
+            if count > 1
+        ]
+        return {
+            'total_ms': 1000 * (time.perf_counter() - self.started),
+            'queries': sum(self.queries.values()),
+            'query_ms': 1000 * self.query_seconds,
+            'duplicates': duplicates,
+            'templates': self.renders,
+            'render_ms': 1000 * self.render_seconds,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+        }
+
+
+def server_timing(report):
+    return ', '.join((
+        f'db;dur={report["query_ms"]:.1f};desc="{report["queries"]} queries"',
+        f'tpl;dur={report["render_ms"]:.1f}',
+        f'cache;desc="{report["cache_hits"]} hits, '
+        f'{report["cache_misses"]} misses"',
+        f'total;dur={report["total_ms"]:.1f}',
+    ))
+
+
+def _instrument_templates():
+    render = Template.render
+    if getattr(render, 'profiled', False):
+        return
+
+    @wraps(render)
+    def profiled_render(self, *args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return render(self, *args, **kwargs)
+        profile.renders += 1
+        profile.render_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            profile.render_depth -= 1
+            # вложенные рендеры (карточки постов) уже внутри внешнего
+            if not profile.render_depth:
+                profile.render_seconds += time.perf_counter() - started
+
+    profiled_render.profiled = True
+    Template.render = profiled_render
+
+
+def _instrument_cache(stack, profile):
+    # кэши в Django 2.2 свои у каждого потока, поэтому методы
+    # подменяются только у экземпляра текущего потока
+    cache = caches['default']
+    get, get_many = cache.get, cache.get_many
+
+    def profiled_get(key, default=None, version=None):
+        value = get(key, default, version=version)
+        if value is default:
+            profile.cache_misses += 1
+        else:
+            profile.cache_hits += 1
+        return value
+
+    def profiled_get_many(keys, version=None):
+        keys = list(keys)
+        found = get_many(keys, version=version)
+        profile.cache_hits += len(found)
+        profile.cache_misses += len(keys) - len(found)
+        return found
+
+    cache.get, cache.get_many = profiled_get, profiled_get_many
+    stack.callback(vars(cache).pop, 'get', None)
+    stack.callback(vars(cache).pop, 'get_many', None)
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        _instrument_templates()
+
+    def __call__(self, request):
+        forced = settings.DEBUG and REPORT_PARAM in request.GET
+        if not forced and random.random() >= settings.PROFILING_SAMPLE_RATE:
+            return self.get_response(request)
+        profile = Profile()
+        token = _current.set(profile)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(profile.execute))
+                _instrument_cache(stack, profile)
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        report = profile.report()
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            **report,
+        }, ensure_ascii=False))
+        if forced:
+            return JsonResponse(report)
+        response['Server-Timing'] = server_timing(report)
+        return response
+
+
+class ReplicaMiddleware:
+    """Отправляет чтения GET-запросов на реплики (core.routers).
+
+    Запрос, который что-то записал, ставит cookie: пока она жива,
+    пользователь читает с основной базы и видит свои изменения.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        enabled = (request.method in ('GET', 'HEAD')
+                   and PIN_COOKIE not in request.COOKIES)
+        with routers.replica_reads(enabled) as state:
+            response = self.get_response(request)
+        if state.wrote:
+            response.set_cookie(PIN_COOKIE, '1', max_age=REPLICA_PIN_SECONDS,
+                                httponly=True, samesite='Lax')
+        return response
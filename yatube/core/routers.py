@@ -0,0 +1,82 @@
+"""Чтение с реплик с гарантией read-your-writes.
+
+На реплики уходят только чтения GET-запросов, которые пометил
+ReplicaMiddleware. Всё остальное — запись, транзакции, команды,
+фоновые потоки — идёт в основную базу. После записи чтения до конца
+запроса возвращаются на основную базу, а cookie закрепляет за ней
+пользователя ещё на REPLICA_PIN_SECONDS, пока реплика догоняет.
+
+Данные, которые кладутся в кэш до следующего явного сброса, читаются
+с основной базы (primary_reads): иначе первый читатель после сброса
+сохранил бы отстающую копию с реплики под новым ключом. Страницы лент
+читают реплику, когда с их сброса прошло REPLICA_PIN_SECONDS
+(page_cache.settled).
+"""
+import contextvars
+import random
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from yatube.settings import DATABASE_REPLICAS
+
+# приложения, чьи чтения можно отдать реплике; сессии и пользователи
+# всегда читаются с основной базы
+REPLICA_APPS = {'posts'}
+
+
+class ReplicaState:
+    def __init__(self, replica_reads):
+        self.replica_reads = replica_reads
+        self.wrote = False
+
+
+_state = contextvars.ContextVar('replica_state', default=None)
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """Разрешает (или запрещает) чтение с реплик внутри блока."""
+    token = _state.set(ReplicaState(enabled))
+    try:
+        yield _state.get()
+    finally:
+        _state.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """Читает внутри блока с основной базы, не теряя отметки о записи."""
+    state = _state.get()
+    if state is None:
+        yield
+        return
+    enabled = state.replica_reads
+    state.replica_reads = False
+    try:
+        yield
+    finally:
+        if not state.wrote:
+            state.replica_reads = enabled
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if (state is None or not state.replica_reads
+                or model._meta.app_label not in REPLICA_APPS
+                or not DATABASE_REPLICAS
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        return random.choice(DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+            state.replica_reads = False
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # на репликах те же данные, что и в основной базе
+        return True
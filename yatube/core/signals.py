@@ -0,0 +1,30 @@
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from yatube.settings import SQLITE_PRAGMAS, SQLITE_TUNING
+
+# бенчмарк записи выключает настройку, чтобы получить базовую линию;
+# её же проверяет core.backends.sqlite3
+tuning_enabled = SQLITE_TUNING
+
+
+def apply_pragmas(cursor, pragmas=SQLITE_PRAGMAS):
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(connection_created)
+def tune_sqlite(sender, connection, **kwargs):
+    """Настраивает каждое новое соединение SQLite на конкурентную работу.
+
+    В WAL читатели не ждут писателя, а busy_timeout заставляет
+    писателей ждать друг друга вместо ошибки database is locked.
+    """
+    if connection.vendor != 'sqlite' or not tuning_enabled:
+        return
+    pragmas = dict(SQLITE_PRAGMAS)
+    if connection.is_in_memory_db():
+        # у базы в памяти нет журнала на диске
+        pragmas.pop('journal_mode', None)
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, pragmas)
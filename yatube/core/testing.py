@@ -0,0 +1,40 @@
+"""Окружение прогона тестов.
+
+Тесты не должны писать в общие файлы рабочего окружения, поэтому
+на время прогона настройки подменяются: manage.py test делает это
+через TEST_RUNNER, pytest — через фикстуру в tests/conftest.py.
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+from . import kvstore
+
+
+@contextmanager
+def isolated_settings():
+    """Метаданные миниатюр пишутся во временный файл, профилирование
+    выключено: его включают сами тесты."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'thumbnails.sqlite3')
+        with override_settings(THUMBNAIL_KVSTORE_PATH=path,
+                               PROFILING_SAMPLE_RATE=0):
+            kvstore.reset()
+            try:
+                yield
+            finally:
+                kvstore.reset()
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._isolation = isolated_settings()
+        self._isolation.__enter__()
+
+    def teardown_test_environment(self, **kwargs):
+        self._isolation.__exit__(None, None, None)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,381 @@
+import json
+import os
+import sqlite3
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock, skipIf
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.utils import timezone
+from django.test import (Client, SimpleTestCase, TestCase,
+                         TransactionTestCase, override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import page_cache
+from posts.models import Comment, Post
+
+from . import jobs, kvstore, middleware, routers, signals
+from .management.commands import sync_replicas
+from .models import Job
+
+try:
+    from .backends.postgresql_pool import base as pool_base
+except ImproperlyConfigured:
+    pool_base = None
+
+User = get_user_model()
+
+calls = []
+
+
+@jobs.task('tests.record')
+def record(value):
+    calls.append(value)
+
+
+@jobs.task('tests.fail')
+def fail():
+    raise ValueError('boom')
+
+
+class ProfilingMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        for i in range(3):
+            Post.objects.create(author=cls.user, text=f'Пост {i}')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_not_sampled(self):
+        """Без выборки запрос не профилируется"""
+        with override_settings(PROFILING_SAMPLE_RATE=0):
+            response = self.client.get(reverse('posts:index'))
+        self.assertNotIn('Server-Timing', response)
+
+    def test_server_timing_and_log(self):
+        """Профилированный запрос получает Server-Timing и строку лога"""
+        with override_settings(PROFILING_SAMPLE_RATE=1), \
+                self.assertLogs('core.profiling', 'INFO') as logs:
+            response = self.client.get(reverse('posts:index'))
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('tpl;dur=', response['Server-Timing'])
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['path'], reverse('posts:index'))
+        self.assertGreater(record['queries'], 0)
+        self.assertGreater(record['templates'], 0)
+        self.assertGreater(record['cache_misses'], 0)
+
+    @override_settings(DEBUG=True)
+    def test_debug_report(self):
+        """?_profile при DEBUG отдаёт отчёт вместо страницы"""
+        with override_settings(PROFILING_SAMPLE_RATE=0), \
+                self.assertLogs('core.profiling', 'INFO'):
+            self.client.get(reverse('posts:index'), {'_profile': 1})
+            report = self.client.get(
+                reverse('posts:index'), {'_profile': 1}).json()
+        # вторая страница отдана из кэша, шаблоны не рендерились
+        self.assertEqual(report['templates'], 0)
+        self.assertGreater(report['cache_hits'], 0)
+
+    def test_fingerprint(self):
+        """Запросы, отличающиеся только значениями, считаются повтором"""
+        self.assertEqual(
+            middleware.fingerprint(
+                "SELECT * FROM t WHERE id = 1 AND name = 'a' "
+                'AND pk IN (%s, %s)'),
+            middleware.fingerprint(
+                "SELECT * FROM t WHERE id = 22 AND name = 'b''c' "
+                'AND pk IN (%s, %s, %s)'))
+
+
+class SQLiteTuningTest(TransactionTestCase):
+    def test_apply_pragmas(self):
+        """PRAGMA переводят файл базы в WAL"""
+        with tempfile.TemporaryDirectory() as directory:
+            database = sqlite3.connect(os.path.join(directory, 'db.sqlite3'))
+            signals.apply_pragmas(database.cursor())
+            self.assertEqual(
+                database.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+            self.assertEqual(
+                database.execute('PRAGMA busy_timeout').fetchone()[0], 5000)
+            database.close()
+
+    def test_benchmark_writes(self):
+        """Бенчмарк записи сравнивает базовую линию с настроенной базой"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'writes.json')
+            call_command('benchmark_writes', threads=1, writes=6,
+                         output=path, stdout=StringIO())
+            with open(path) as file:
+                results = json.load(file)['results']
+        self.assertEqual(set(results), {'baseline', 'tuned'})
+        self.assertEqual(results['tuned']['errors'], 0)
+        self.assertTrue(signals.tuning_enabled)
+        self.assertFalse(User.objects.exists())
+
+
+class ReplicaRouterTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.TemporaryDirectory()
+        connections.databases['replica'] = {
+            **connections.databases['default'],
+            'NAME': os.path.join(self.directory.name, 'replica.sqlite3'),
+        }
+        patchers = [
+            mock.patch.object(module, 'DATABASE_REPLICAS', ['replica'])
+            for module in (routers, sync_replicas)
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        call_command('sync_replicas', stdout=StringIO())
+        self.user = User.objects.create_user(username='author')
+        self.post = Post.objects.create(author=self.user, text='Пост')
+        self.url = reverse('posts:post_detail',
+                           kwargs={'post_id': self.post.pk})
+
+    def tearDown(self):
+        connections['replica'].close()
+        del connections['replica']
+        del connections.databases['replica']
+        self.directory.cleanup()
+
+    def test_reads_from_replica(self):
+        """Чтения GET идут на реплику и видят её отставание"""
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        call_command('sync_replicas', stdout=StringIO())
+        cache.clear()
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_read_your_writes(self):
+        """После своей записи пользователь читает с основной базы"""
+        self.client.force_login(self.user)
+        call_command('sync_replicas', stdout=StringIO())
+        response = self.client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            {'text': 'Свежий комментарий'})
+        self.assertIn(middleware.PIN_COOKIE, response.cookies)
+        self.assertTrue(Comment.objects.exists())
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Свежий комментарий')
+        self.assertNotIn(middleware.PIN_COOKIE, response.cookies)
+        del self.client.cookies[middleware.PIN_COOKIE]
+        cache.clear()
+        response = self.client.get(self.url)
+        self.assertNotContains(response, 'Свежий комментарий')
+
+    def test_cached_pages_read_primary(self):
+        """Страница, которая ляжет в кэш, читается с основной базы"""
+        self.assertContains(self.client.get(reverse('posts:index')), 'Пост')
+        router = routers.ReplicaRouter()
+        with routers.replica_reads() as state:
+            with routers.primary_reads():
+                self.assertEqual(router.db_for_read(Post), 'default')
+            self.assertEqual(router.db_for_read(Post), 'replica')
+            with routers.primary_reads():
+                router.db_for_write(Post)
+            self.assertTrue(state.wrote)
+            self.assertEqual(router.db_for_read(Post), 'default')
+
+    def test_settled_pages_read_replica(self):
+        """Промах кэша ленты читает реплику, только когда она догнала"""
+        call_command('sync_replicas', stdout=StringIO())
+        Post.objects.create(author=self.user, text='Свежий пост')
+        url = reverse('posts:index')
+        self.assertContains(self.client.get(url), 'Свежий пост')
+        cache.clear()
+        with mock.patch.object(page_cache, 'REPLICA_PIN_SECONDS', 0):
+            self.assertNotContains(self.client.get(url), 'Свежий пост')
+
+    def test_transactions_use_primary(self):
+        """Внутри транзакции и без middleware читается основная база"""
+        router = routers.ReplicaRouter()
+        self.assertEqual(router.db_for_read(Post), 'default')
+        with routers.replica_reads():
+            self.assertEqual(router.db_for_read(Post), 'replica')
+            self.assertEqual(router.db_for_read(User), 'default')
+            with transaction.atomic():
+                self.assertEqual(router.db_for_read(Post), 'default')
+
+
+class JobQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def run_jobs(self):
+        call_command('run_jobs', once=True, stdout=StringIO())
+
+    def test_run_and_idempotency(self):
+        """Задача с тем же ключом ставится один раз и выполняется"""
+        first = jobs.enqueue('tests.record', 1, key='record:1')
+        second = jobs.enqueue('tests.record', 2, key='record:1')
+        self.assertEqual(first.pk, second.pk)
+        jobs.enqueue('tests.record', 3)
+        self.run_jobs()
+        self.assertEqual(sorted(calls), [1, 3])
+        stats = jobs.stats()
+        self.assertEqual(stats['done'], 2)
+        self.assertEqual(stats['queued'], 0)
+        self.assertGreater(stats['latency_p95_ms'], 0)
+
+    def test_retries_with_backoff(self):
+        """Упавшая задача повторяется позже, затем помечается failed"""
+        job = jobs.enqueue('tests.fail', max_attempts=2)
+        with self.assertLogs('core.jobs', 'ERROR'):
+            self.run_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('boom', job.error)
+        self.assertGreater(job.run_at, timezone.now())
+        # до срока повтора воркер задачу не берёт
+        self.run_jobs()
+        self.assertEqual(Job.objects.get(pk=job.pk).attempts, 1)
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs('core.jobs', 'ERROR'):
+            self.run_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(jobs.stats()['failed'], 1)
+
+    def test_requeue_failed(self):
+        """Повторная постановка по key перезапускает упавшую задачу"""
+        job = jobs.enqueue('tests.fail', key='fail', max_attempts=1)
+        with self.assertLogs('core.jobs', 'ERROR'):
+            self.run_jobs()
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.FAILED)
+        again = jobs.enqueue('tests.fail', key='fail', max_attempts=1)
+        self.assertEqual(again.pk, job.pk)
+        self.assertEqual(again.status, Job.QUEUED)
+        self.assertEqual(again.attempts, 0)
+        self.assertEqual(again.error, '')
+        with self.assertLogs('core.jobs', 'ERROR'):
+            self.run_jobs()
+
+    def test_rollback_cancels_job(self):
+        """Задача из откатившейся транзакции не ставится"""
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            jobs.enqueue('tests.record', 1)
+            raise RuntimeError
+        self.assertFalse(Job.objects.exists())
+
+    def test_requeue_stale(self):
+        """Задачу пропавшего воркера берёт другой"""
+        job = jobs.enqueue('tests.record', 1)
+        jobs.claim(1)
+        Job.objects.filter(pk=job.pk).update(
+            started=timezone.now() - timedelta(days=1))
+        self.run_jobs()
+        self.assertEqual(calls, [1])
+
+
+class SessionsTest(TestCase):
+    @override_settings(
+        SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+    def test_session_is_read_from_cache(self):
+        """Сессия вошедшего пользователя не читается из базы"""
+        user = User.objects.create_user(username='reader')
+        client = Client()
+        client.force_login(user)
+        with CaptureQueriesContext(connections['default']) as captured:
+            self.assertEqual(
+                client.get(reverse('posts:index')).status_code, 200)
+        self.assertFalse([query for query in captured.captured_queries
+                          if 'django_session' in query['sql']])
+
+    def test_prune_sessions(self):
+        """Истёкшие сессии удаляются пачками, живые остаются"""
+        now = timezone.now()
+        for number in range(5):
+            Session.objects.create(session_key=f'old{number}',
+                                   session_data='',
+                                   expire_date=now - timedelta(days=1))
+        Session.objects.create(session_key='alive', session_data='',
+                               expire_date=now + timedelta(days=1))
+        out = StringIO()
+        call_command('prune_sessions', batch_size=2, stdout=out)
+        self.assertIn('5', out.getvalue())
+        self.assertEqual(
+            list(Session.objects.values_list('session_key', flat=True)),
+            ['alive'])
+
+
+class TestEnvironmentTest(TestCase):
+    def test_kvstore_is_temporary(self):
+        """Тесты пишут метаданные миниатюр не в общий файл"""
+        self.assertNotEqual(
+            kvstore.store().path,
+            os.path.join(settings.BASE_DIR, 'thumbnails.sqlite3'))
+
+
+@skipIf(pool_base is None, 'psycopg2 не установлен')
+class ConnectionPoolTest(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(pool_base, 'ThreadedConnectionPool')
+        self.pool_class = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.dict(pool_base.DatabaseWrapper._pools, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def wrapper(self):
+        return pool_base.DatabaseWrapper({
+            'NAME': 'yatube', 'OPTIONS': {}, 'TIME_ZONE': None,
+            'POOL': {'MIN_SIZE': 1, 'MAX_SIZE': 1, 'TIMEOUT': 0},
+        }, 'pooled')
+
+    def test_get_and_put(self):
+        """Соединение берётся из пула и возвращается в него"""
+        pool = pool_base.Pool({'dbname': 'yatube'}, 1, 2, 0)
+        self.pool_class.assert_called_once_with(1, 2, dbname='yatube')
+        connection = pool.get()
+        self.assertIs(connection, self.pool_class.return_value.getconn())
+        connection.closed = 0
+        pool.put(connection)
+        self.pool_class.return_value.putconn.assert_called_once_with(
+            connection, close=0)
+
+    def test_connection_reuse(self):
+        """Все соединения псевдонима базы живут в одном пуле"""
+        idle = [mock.Mock(closed=0)]
+        pool = self.pool_class.return_value
+        pool.getconn.side_effect = idle.pop
+        pool.putconn.side_effect = (
+            lambda connection, close: idle.append(connection))
+        first, second = self.wrapper(), self.wrapper()
+        first.connection = first.get_new_connection({'dbname': 'yatube'})
+        first._close()
+        second.connection = second.get_new_connection({'dbname': 'yatube'})
+        self.pool_class.assert_called_once()
+        self.assertIs(first.connection, second.connection)
+
+    def test_exhausted(self):
+        """Когда все соединения заняты, пул отвечает ошибкой"""
+        pool = pool_base.Pool({}, 1, 1, 0)
+        connection = pool.get()
+        with self.assertRaises(pool_base.base.Database.OperationalError):
+            pool.get()
+        pool.put(connection)
+        self.assertIs(pool.get(), connection)
+
+    def test_failed_get_releases_slot(self):
+        """Ошибка соединения не занимает место в пуле"""
+        pool = pool_base.Pool({}, 1, 1, 0)
+        getconn = self.pool_class.return_value.getconn
+        getconn.side_effect = pool_base.base.Database.OperationalError
+        with self.assertRaises(pool_base.base.Database.OperationalError):
+            pool.get()
+        getconn.side_effect = None
+        self.assertIs(pool.get(), getconn.return_value)
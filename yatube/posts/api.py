@@ -0,0 +1,225 @@
+"""JSON API лент и поста только для чтения.
+
+Отдаются только нужные клиенту поля. Ленты листаются теми же
+курсорами, что и HTML-страницы. ETag строится из самого нового
+(pub_date, id) ленты и поколений её областей кэша, поэтому правки и
+удаления тоже меняют его. Last-Modified — дата самого нового поста,
+но не раньше последнего сброса кэша ленты. Неизменившаяся лента
+отвечает 304, не выбирая и не сериализуя посты.
+"""
+import hashlib
+from functools import wraps
+
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import (condition, require_GET,
+                                          require_POST)
+
+from yatube.settings import MAX_POSTS
+
+from . import counters, feeds, notifications, page_cache, thumbnails
+from .models import Group, User
+from .paginators import CursorPaginator
+
+
+def serialize_post(request, post):
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'pub_date': post.pub_date.isoformat(),
+        'author': post.author.username,
+        'group': post.group.slug if post.group_id else None,
+        'image': (request.build_absolute_uri(
+            thumbnails.get_url(post.image, 'card'))
+            if post.image else None),
+    }
+
+
+def serialize_comment(comment):
+    return {
+        'id': comment.pk,
+        'author': comment.author.username,
+        'text': comment.text,
+        'created': comment.created.isoformat(),
+    }
+
+
+def serialize_notification(notification):
+    return {
+        'id': notification.pk,
+        'post': notification.post_id,
+        'author': notification.post.author.username,
+        'text': str(notification.post),
+        'created': notification.created.isoformat(),
+        'is_read': notification.is_read,
+    }
+
+
+def _etag(*parts):
+    return hashlib.md5('|'.join(map(str, parts)).encode()).hexdigest()
+
+
+class FeedState:
+    """Пагинатор и валидаторы ленты, посчитанные один раз на запрос."""
+
+    def __init__(self, request, queryset, order, scopes):
+        self.paginator = CursorPaginator(queryset, MAX_POSTS, **order)
+        newest = self.paginator.object_list.values_list(
+            'pub_date', self.paginator.tiebreak).first()
+        changed_at = page_cache.changed_at(scopes)
+        self.etag = _etag(request.get_full_path(), request.user.pk,
+                          newest, changed_at.timestamp())
+        self.last_modified = max(newest[0], changed_at) if newest else None
+
+
+def feed_api(source):
+    """JSON-view ленты.
+
+    source(request, **kwargs) возвращает выборку постов, параметры
+    пагинации и области кэша, от которых зависит лента.
+    """
+    def state(request, **kwargs):
+        if not hasattr(request, 'feed_state'):
+            request.feed_state = FeedState(request, *source(request,
+                                                            **kwargs))
+        return request.feed_state
+
+    @require_GET
+    @condition(
+        etag_func=lambda request, **kwargs: state(request, **kwargs).etag,
+        last_modified_func=(
+            lambda request, **kwargs: state(request, **kwargs).last_modified)
+    )
+    @wraps(source)
+    def view(request, **kwargs):
+        page = state(request, **kwargs).paginator.get_cursor_page(
+            request.GET.get('cursor'))
+        thumbnails.preload(post.image.name for post in page)
+        return JsonResponse({
+            'results': [serialize_post(request, post) for post in page],
+            'next': page.next_cursor if page.has_next() else None,
+            'previous': page.previous_cursor if page.has_previous() else None,
+        })
+    return view
+
+
+def api_login_required(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'detail': 'Нужна авторизация'}, status=401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+@feed_api
+def index(request):
+    return feeds.index_posts(), feeds.FEED_ORDER, [page_cache.INDEX]
+
+
+@feed_api
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return (feeds.group_posts(group), feeds.FEED_ORDER,
+            [page_cache.group_scope(slug)])
+
+
+@feed_api
+def profile(request, username):
+    author = get_object_or_404(User, username=username)
+    return (feeds.profile_posts(author), feeds.FEED_ORDER,
+            [page_cache.profile_scope(username)])
+
+
+@api_login_required
+@feed_api
+def follow_index(request):
+    return (feeds.follow_posts(request.user), feeds.FOLLOW_ORDER,
+            [page_cache.follow_scope(request.user.pk)])
+
+
+def _post(request, post_id):
+    if not hasattr(request, 'api_post'):
+        post = get_object_or_404(feeds.detail_posts(), id=post_id)
+        # в ответе есть число постов автора: его новый пост тоже
+        # меняет валидаторы
+        post.author_posts = counters.get(counters.AUTHOR_POSTS,
+                                         post.author_id)
+        post.changed_at = page_cache.changed_at([
+            page_cache.post_scope(post.pk),
+            page_cache.profile_scope(post.author.username),
+        ])
+        request.api_post = post
+    return request.api_post
+
+
+def _post_etag(request, post_id):
+    post = _post(request, post_id)
+    return _etag(request.get_full_path(), post.pk, post.updated.isoformat(),
+                 post.author_posts, post.changed_at.timestamp())
+
+
+def _post_last_modified(request, post_id):
+    post = _post(request, post_id)
+    return max(post.updated, post.changed_at)
+
+
+@require_GET
+@condition(etag_func=_post_etag, last_modified_func=_post_last_modified)
+def post_detail(request, post_id):
+    post = _post(request, post_id)
+    comments = feeds.comments_page(post, None)
+    data = serialize_post(request, post)
+    data.update({
+        'author_posts': post.author_posts,
+        'comments_count': counters.get(counters.POST_COMMENTS, post.pk),
+        'comments': [serialize_comment(comment) for comment in comments],
+        'comments_next': (comments.next_cursor if comments.has_next()
+                          else None),
+    })
+    return JsonResponse(data)
+
+
+@require_GET
+@api_login_required
+def notification_list(request):
+    paginator = CursorPaginator(
+        request.user.notifications.select_related('post__author'),
+        MAX_POSTS, key='created')
+    page = paginator.get_cursor_page(request.GET.get('cursor'))
+    return JsonResponse({
+        'results': [serialize_notification(item) for item in page],
+        'next': page.next_cursor if page.has_next() else None,
+        'previous': page.previous_cursor if page.has_previous() else None,
+        'unread': notifications.unread_count(request.user.pk),
+    })
+
+
+@require_GET
+@api_login_required
+def notification_unread(request):
+    return JsonResponse(
+        {'unread': notifications.unread_count(request.user.pk)})
+
+
+@require_POST
+@api_login_required
+def notification_read(request):
+    """Отмечает прочитанными уведомления из параметров id или все."""
+    try:
+        ids = [int(pk) for pk in request.POST.getlist('id')]
+    except ValueError:
+        return JsonResponse({'detail': 'id должны быть числами'},
+                            status=400)
+    read = notifications.mark_read(request.user.pk, ids or None)
+    return JsonResponse({
+        'read': read,
+        'unread': notifications.unread_count(request.user.pk),
+    })
+
+
+@require_POST
+@api_login_required
+def notification_clear(request):
+    return JsonResponse(
+        {'deleted': notifications.clear(request.user.pk), 'unread': 0})
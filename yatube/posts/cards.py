@@ -0,0 +1,69 @@
+"""Кэш отрендеренных карточек постов (includes/posts_card.html).
+
+Ключ карточки содержит id поста, отметку его изменения и поколения
+(page_cache) автора и группы, поэтому правка поста, переименование
+автора или группы сразу дают новый ключ. Карточки всей страницы
+достаются из кэша одним get_many, недостающие рендерятся и
+кладутся обратно одним set_many.
+"""
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from yatube.settings import POST_CARD_TIMEOUT
+
+from . import page_cache, thumbnails
+
+TEMPLATE = 'includes/posts_card.html'
+
+
+def author_scope(user_id):
+    return f'card:author:{user_id}'
+
+
+def group_scope(group_id):
+    return f'card:group:{group_id}'
+
+
+def _scopes(post):
+    scopes = [author_scope(post.author_id)]
+    if post.group_id:
+        scopes.append(group_scope(post.group_id))
+    return scopes
+
+
+def card_keys(posts, show_group):
+    """Словарь {ключ карточки: пост}; поколения читаются одним запросом."""
+    scopes = sorted({scope for post in posts for scope in _scopes(post)})
+    stamps = dict(zip(scopes, page_cache.generations(scopes)))
+    keys = {}
+    for post in posts:
+        stamp = post.updated.timestamp() if post.updated else 0
+        related = ':'.join(str(stamps[scope]) for scope in _scopes(post))
+        key = f'post_card:{post.pk}:{stamp}:{related}:{int(show_group)}'
+        keys[key] = post
+    return keys
+
+
+def render_cards(posts, group=None):
+    """Возвращает словарь {post.pk: html} для всех постов."""
+    show_group = group is None
+    keys = card_keys(posts, show_group)
+    found = cache.get_many(keys)
+    cards = {keys[key].pk: html for key, html in found.items()}
+    missing = {}
+    template = get_template(TEMPLATE)
+    thumbnails.preload(
+        post.image.name for key, post in keys.items() if key not in found)
+    for key, post in keys.items():
+        if key not in found:
+            html = template.render({'post': post, 'group': group})
+            missing[key] = cards[post.pk] = html
+    if missing:
+        cache.set_many(missing, POST_CARD_TIMEOUT)
+    return {pk: mark_safe(html) for pk, html in cards.items()}
+
+
+def invalidate(post):
+    """Удаляет карточки поста с его текущей отметкой изменения."""
+    cache.delete_many([*card_keys([post], True), *card_keys([post], False)])
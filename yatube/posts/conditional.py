@@ -0,0 +1,118 @@
+"""Условные GET для HTML-страниц.
+
+Датой изменения ленты служит поколение её области page_cache: это
+время последнего сброса, а сбрасывает его любое изменение постов
+ленты, в том числе удаление. Поэтому валидаторы лент не агрегируют
+таблицу постов, а берут поколение из кэша и строку счётчика. Для
+поста к ним добавляются число и дата последнего комментария. Если
+клиент прислал совпадающие If-None-Match или If-Modified-Since, ответ
+304 уходит без рендеринга.
+
+В ETag входят пользователь и CSRF-cookie: шапка и формы страницы у
+каждого свои. Last-Modified отдаётся только анонимам, потому что
+по одной дате нельзя отличить страницы разных пользователей.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from . import counters, follows, page_cache
+from .models import Counter, Group, Post, User
+
+
+def _counter(kind, object_ids):
+    """Счётчик объекта, заданного подзапросом, без COUNT(*)."""
+    return Counter.objects.filter(
+        kind=kind, object_id__in=object_ids,
+    ).values_list('value', flat=True).first()
+
+
+def index_state(request):
+    return (page_cache.changed_at([page_cache.INDEX]),)
+
+
+def group_state(request, slug):
+    return (page_cache.changed_at([page_cache.group_scope(slug)]),
+            _counter(counters.GROUP_POSTS,
+                     Group.objects.filter(slug=slug).values('pk')))
+
+
+def profile_state(request, username):
+    # от подписок зависит кнопка «Подписаться»
+    return (page_cache.changed_at([page_cache.profile_scope(username)]),
+            _counter(counters.AUTHOR_POSTS,
+                     User.objects.filter(username=username).values('pk')),
+            hash(follows.for_user(request.user)))
+
+
+def follow_state(request):
+    scope = page_cache.follow_scope(request.user.pk)
+    return (page_cache.changed_at([scope]),)
+
+
+def post_state(request, post_id):
+    author_posts = Counter.objects.filter(
+        kind=counters.AUTHOR_POSTS, object_id=OuterRef('author_id'),
+    ).values('value')
+    state = (
+        Post.objects.filter(pk=post_id).order_by()
+        .annotate(comments_count=Count('comments'),
+                  last_comment=Max('comments__created'),
+                  author_posts=Subquery(author_posts,
+                                        output_field=IntegerField()))
+        .values_list('updated', 'last_comment', 'comments_count',
+                     'author_posts')
+        .first()
+    )
+    if state is None:
+        return None, None
+    updated, last_comment, *rest = state
+    # удаление комментария не двигает дат, но сбрасывает поколение
+    changed_at = page_cache.changed_at([page_cache.post_scope(post_id)])
+    return (max(filter(None, (updated, last_comment, changed_at))), *rest)
+
+
+def conditional_page(state_func):
+    """Отвечает 304, если страница не менялась с прошлого визита.
+
+    state_func получает (request, **kwargs) view и возвращает кортеж:
+    дату последнего изменения и любые другие значения, от которых
+    зависит страница.
+    """
+    def validators(request, **kwargs):
+        if not hasattr(request, 'page_validators'):
+            last_modified, *state = state_func(request, **kwargs)
+            parts = [
+                request.get_full_path(),
+                request.user.pk,
+                request.COOKIES.get(settings.CSRF_COOKIE_NAME),
+                last_modified and last_modified.isoformat(),
+                *state,
+            ]
+            etag = hashlib.md5(
+                '|'.join(map(str, parts)).encode()).hexdigest()
+            if request.user.is_authenticated:
+                last_modified = None
+            request.page_validators = etag, last_modified
+        return request.page_validators
+
+    def decorator(view):
+        conditional_view = condition(
+            etag_func=lambda request, **kwargs: validators(
+                request, **kwargs)[0],
+            last_modified_func=lambda request, **kwargs: validators(
+                request, **kwargs)[1],
+        )(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            # без no-cache браузер мог бы показать копию, не спросив
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
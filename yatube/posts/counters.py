@@ -0,0 +1,152 @@
+"""Денормализованные счётчики постов, комментариев и подписок.
+
+Счётчики обновляются сигналами при создании и удалении объектов
+атомарным UPDATE ... SET value = value + delta. Отсутствующий
+счётчик создаётся из честного COUNT(*) при первом обращении,
+расхождения чинит команда reconcile_counters.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import Comment, Counter, Follow, Notification, Post
+
+AUTHOR_POSTS = 'author_posts'
+GROUP_POSTS = 'group_posts'
+POST_COMMENTS = 'post_comments'
+FOLLOWERS = 'followers'
+FOLLOWING = 'following'
+UNREAD_NOTIFICATIONS = 'unread_notifications'
+
+# вид счётчика -> (модель, поле, по которому считаем)
+SOURCES = {
+    AUTHOR_POSTS: (Post, 'author_id'),
+    GROUP_POSTS: (Post, 'group_id'),
+    POST_COMMENTS: (Comment, 'post_id'),
+    FOLLOWERS: (Follow, 'author_id'),
+    FOLLOWING: (Follow, 'user_id'),
+    UNREAD_NOTIFICATIONS: (Notification, 'user_id'),
+}
+
+# дополнительные условия выборки, если считаются не все строки
+CONDITIONS = {
+    UNREAD_NOTIFICATIONS: {'is_read': False},
+}
+
+BATCH_SIZE = 1000
+
+
+def _rows(kind):
+    model, field = SOURCES[kind]
+    return model.objects.filter(**CONDITIONS.get(kind, {})), field
+
+
+def count(kind, object_id):
+    """Честный COUNT(*) для счётчика."""
+    rows, field = _rows(kind)
+    return rows.filter(**{field: object_id}).count()
+
+
+def _create(kind, object_id):
+    value = count(kind, object_id)
+    try:
+        with transaction.atomic():
+            Counter.objects.create(
+                kind=kind, object_id=object_id, value=value)
+    except IntegrityError:
+        # счётчик успели создать параллельно
+        return Counter.objects.get(kind=kind, object_id=object_id).value
+    return value
+
+
+def change(kind, object_id, delta):
+    """Атомарно изменяет счётчик на delta."""
+    if object_id is None:
+        return
+    updated = Counter.objects.filter(
+        kind=kind, object_id=object_id
+    ).update(value=F('value') + delta)
+    if not updated:
+        # значение берётся из базы, где изменение уже учтено
+        _create(kind, object_id)
+
+
+def change_many(kind, object_ids, delta):
+    """Изменяет на delta счётчики набора объектов одним UPDATE.
+
+    object_ids может быть и подзапросом. Отсутствующие счётчики не
+    создаются: их посчитает COUNT(*) при первом обращении.
+    """
+    return Counter.objects.filter(
+        kind=kind, object_id__in=object_ids
+    ).update(value=F('value') + delta)
+
+
+def get(kind, object_id):
+    value = Counter.objects.filter(
+        kind=kind, object_id=object_id
+    ).values_list('value', flat=True).first()
+    if value is None:
+        return _create(kind, object_id)
+    return value
+
+
+def forget(kind, object_id):
+    Counter.objects.filter(kind=kind, object_id=object_id).delete()
+
+
+def _fix_batch(kind, actual):
+    stored = {
+        counter.object_id: counter
+        for counter in Counter.objects.filter(
+            kind=kind, object_id__in=list(actual))
+    }
+    stale = []
+    for object_id, value in actual.items():
+        counter = stored.get(object_id)
+        if counter is not None and counter.value != value:
+            counter.value = value
+            stale.append(counter)
+    missing = [
+        Counter(kind=kind, object_id=object_id, value=value)
+        for object_id, value in actual.items() if object_id not in stored
+    ]
+    Counter.objects.bulk_update(stale, ['value'], batch_size=BATCH_SIZE)
+    # размер пачки вставки выбирает бэкенд: SQLite не примет больше
+    # 500 строк в одном INSERT
+    Counter.objects.bulk_create(missing)
+    return len(stale) + len(missing)
+
+
+def reconcile(kind):
+    """Сверяет счётчики вида kind с базой, возвращает число исправлений.
+
+    Настоящие значения читаются потоково одним GROUP BY,
+    сравнение и запись идут пачками по BATCH_SIZE.
+    """
+    source, field = _rows(kind)
+    rows = (
+        source.filter(**{f'{field}__isnull': False})
+        .order_by().values(field).annotate(total=Count('pk'))
+        .values_list(field, 'total')
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    fixed = 0
+    batch = {}
+    with transaction.atomic():
+        for object_id, total in rows:
+            batch[object_id] = total
+            if len(batch) >= BATCH_SIZE:
+                fixed += _fix_batch(kind, batch)
+                batch = {}
+        fixed += _fix_batch(kind, batch)
+        fixed += _reset_empty(kind, source, field)
+    return fixed
+
+
+def _reset_empty(kind, source, field):
+    # объекты, у которых строк не осталось совсем
+    empty = Counter.objects.filter(kind=kind).exclude(
+        object_id__in=source.filter(
+            **{f'{field}__isnull': False}).values(field)
+    ).exclude(value=0)
+    return empty.update(value=0)
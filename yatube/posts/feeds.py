@@ -0,0 +1,57 @@
+"""Выборки лент и комментариев.
+
+Их используют и view, и аудит планов запросов (explain_feeds), поэтому
+проверяется ровно тот запрос, который выполняется на странице.
+Рядом с выборкой лежат параметры CursorPaginator, под которые
+подобраны индексы.
+"""
+from django.db.models import F
+
+from yatube.settings import COMMENTS_PER_PAGE
+
+from .models import Post
+from .paginators import CursorPaginator
+
+FEED_ORDER = {}
+
+# лента подписок сортируется по колонкам timelineentry, чтобы
+# страница читалась прямо из индекса timeline_user_feed_idx
+FOLLOW_ORDER = {'key': 'feed_date', 'tiebreak': 'feed_post'}
+
+COMMENTS_ORDER = {'key': 'created', 'descending': False}
+
+
+def index_posts():
+    return Post.objects.select_related('author', 'group')
+
+
+def group_posts(group):
+    return group.posts.select_related('author')
+
+
+def profile_posts(author):
+    return author.posts.select_related('group')
+
+
+def follow_posts(user):
+    return (
+        Post.objects.select_related('author', 'group')
+        .filter(timeline_entries__user=user)
+        .annotate(feed_date=F('timeline_entries__pub_date'),
+                  feed_post=F('timeline_entries__post_id'))
+    )
+
+
+def detail_posts():
+    """Пост страницы post_detail вместе с автором и группой."""
+    return Post.objects.select_related('author', 'group')
+
+
+def post_comments(post):
+    return post.comments.select_related('author')
+
+
+def comments_page(post, cursor):
+    paginator = CursorPaginator(post_comments(post), COMMENTS_PER_PAGE,
+                                **COMMENTS_ORDER)
+    return paginator.get_cursor_page(cursor)
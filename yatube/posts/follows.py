@@ -0,0 +1,53 @@
+"""Кого читает пользователь.
+
+Множество id авторов, на которых подписан пользователь, лежит в кэше
+целиком и сбрасывается сигналами Follow. Проверка «подписан ли я»
+для любого числа авторов на странице стоит одного обращения к кэшу:
+множество запоминается на объекте пользователя до конца запроса.
+"""
+from django.core.cache import cache
+from django.db import transaction
+
+from core import routers
+from yatube.settings import FOLLOWING_IDS_TIMEOUT
+
+from .models import Follow
+
+
+def _key(user_id):
+    return f'following:{user_id}'
+
+
+def following_ids(user_id):
+    """frozenset id авторов, на которых подписан пользователь."""
+    if not user_id:
+        return frozenset()
+    key = _key(user_id)
+    value = cache.get(key)
+    if value is None:
+        with routers.primary_reads():
+            value = frozenset(Follow.objects.filter(user_id=user_id)
+                              .values_list('author_id', flat=True))
+        cache.set(key, value, FOLLOWING_IDS_TIMEOUT)
+    return value
+
+
+def for_user(user):
+    """following_ids, прочитанный один раз за запрос."""
+    if not user.is_authenticated:
+        return frozenset()
+    if not hasattr(user, '_following_ids'):
+        user._following_ids = following_ids(user.pk)
+    return user._following_ids
+
+
+def is_following(user, author_id):
+    return author_id in for_user(user)
+
+
+def forget(user_id):
+    """Сбрасывает множество; как и page_cache.bump, повторно после
+    коммита."""
+    key = _key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
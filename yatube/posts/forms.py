@@ -1,5 +1,7 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
+from . import uploads
 from .models import Post, Comment
 
 
@@ -9,6 +11,36 @@ class PostForm(forms.ModelForm):
         fields = ("text", "group", "image",)
         labels = {"text": "Текст вашего поста", "group": "Группа"}
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_image = None
+        # слишком большой файл отклоняется до того, как ImageField
+        # откроет его в Pillow
+        self.upload_error = None
+        upload = self.files.get('image')
+        if upload is not None:
+            self.upload_error = uploads.precheck(upload)
+            if self.upload_error:
+                self.files = self.files.copy()
+                del self.files['image']
+
+    def clean_image(self):
+        if self.upload_error:
+            raise forms.ValidationError(self.upload_error)
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            try:
+                self.prepared_image = uploads.PreparedImage(image)
+            except Exception:
+                raise forms.ValidationError(
+                    self.fields['image'].error_messages['invalid_image'])
+        return image
+
+    def save(self, commit=True):
+        if self.prepared_image is not None:
+            self.instance.image = self.prepared_image.store()
+        return super().save(commit)
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,171 @@
+import json
+import math
+import os
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Group, Post
+from posts.urls import app_name, urlpatterns
+from yatube.settings import BASE_DIR
+
+User = get_user_model()
+
+RESULTS_DIR = os.path.join(BASE_DIR, 'benchmarks')
+
+# пути, которые принимают только POST
+POST_ROUTES = {'add_comment', 'api_notifications_read',
+               'api_notifications_clear'}
+# пути, которые меняют подписки даже на GET
+GET_WRITE_ROUTES = {'profile_follow', 'profile_unfollow'}
+# бенчмарк чтения пропускает пишущие пути: каждый прогон добавлял бы
+# комментарии и переключал подписки, сбрасывал кэш и закреплял клиента
+# за основной базой. Запись меряет benchmark_writes
+WRITE_ROUTES = POST_ROUTES | GET_WRITE_ROUTES
+
+
+def percentile(values, share):
+    """Перцентиль по ближайшему рангу."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(math.ceil(share * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def summarize(latencies, queries, statuses, elapsed):
+    return {
+        'requests': len(latencies),
+        'p50_ms': 1000 * percentile(latencies, 0.5),
+        'p95_ms': 1000 * percentile(latencies, 0.95),
+        'p99_ms': 1000 * percentile(latencies, 0.99),
+        'mean_ms': 1000 * sum(latencies) / len(latencies),
+        'queries_mean': sum(queries) / len(queries),
+        'queries_max': max(queries),
+        'throughput_rps': len(latencies) / elapsed if elapsed else 0.0,
+        'statuses': sorted(set(statuses)),
+    }
+
+
+class Command(BaseCommand):
+    help = ('Прогоняет читающие адреса posts через тестовый клиент и '
+            'сохраняет задержки, число запросов к базе и пропускную '
+            'способность в JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50,
+                            help='Запросов на каждый адрес')
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--cold', action='store_true',
+                            help='Очищать кэш перед каждым запросом')
+        parser.add_argument('--user', help='Под кем заходить на сайт')
+        parser.add_argument('--output',
+                            help='Файл результатов, по умолчанию '
+                                 'benchmarks/<время>.json')
+        parser.add_argument('--compare',
+                            help='Прошлый файл результатов для сравнения')
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        post = Post.objects.order_by('-pk').first()
+        group = Group.objects.order_by('pk').first()
+        if post is None or group is None:
+            raise CommandError('Нет данных: сначала запустите seed_data')
+        client = Client()
+        client.force_login(user)
+        results = {}
+        for name, (url, data) in self.scenarios(post, group).items():
+            results[name] = self.run(client, url, data, options)
+            self.report(name, results[name])
+        run = {
+            'started': timezone.now().isoformat(),
+            'options': {key: options[key]
+                        for key in ('requests', 'warmup', 'cold')},
+            'database': connection.vendor,
+            'results': results,
+        }
+        path = options['output'] or os.path.join(
+            RESULTS_DIR, f'{timezone.now():%Y%m%d-%H%M%S}.json')
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as file:
+            json.dump(run, file, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'Результаты: {path}'))
+        if options['compare']:
+            self.compare(options['compare'], results)
+
+    def get_user(self, username):
+        users = User.objects.order_by('pk')
+        user = (users.filter(username=username) if username
+                else users.filter(follower__isnull=False)).first()
+        if user is None:
+            raise CommandError('Не найден пользователь для входа')
+        return user
+
+    def scenarios(self, post, group):
+        """Адрес и данные GET-запроса для каждого пути posts.urls,
+        кроме WRITE_ROUTES."""
+        kwargs = {
+            'slug': group.slug,
+            'username': post.author.username,
+            'post_id': post.pk,
+        }
+        data = {'search': {'q': post.text.split()[0]}}
+        scenarios = {}
+        for pattern in urlpatterns:
+            if pattern.name in WRITE_ROUTES:
+                continue
+            url = reverse(
+                f'{app_name}:{pattern.name}',
+                kwargs={key: kwargs[key]
+                        for key in pattern.pattern.converters})
+            scenarios[pattern.name] = (url, data.get(pattern.name, {}))
+        return scenarios
+
+    def run(self, client, url, data, options):
+        for _ in range(options['warmup']):
+            client.get(url, data)
+        latencies, queries, statuses = [], [], []
+        started = time.perf_counter()
+        for _ in range(options['requests']):
+            if options['cold']:
+                cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                request_started = time.perf_counter()
+                response = client.get(url, data)
+                latencies.append(time.perf_counter() - request_started)
+            queries.append(len(captured))
+            statuses.append(response.status_code)
+        return summarize(latencies, queries, statuses,
+                         time.perf_counter() - started)
+
+    def report(self, name, result):
+        self.stdout.write(
+            f'{name:18} p50 {result["p50_ms"]:7.1f} мс  '
+            f'p95 {result["p95_ms"]:7.1f} мс  '
+            f'p99 {result["p99_ms"]:7.1f} мс  '
+            f'запросов к БД {result["queries_mean"]:5.1f}  '
+            f'{result["throughput_rps"]:7.1f} rps'
+        )
+
+    def compare(self, path, results):
+        with open(path) as file:
+            previous = json.load(file)['results']
+        self.stdout.write(f'Сравнение с {path}:')
+        for name, result in results.items():
+            if name not in previous:
+                continue
+            before = previous[name]['p95_ms']
+            change = (result['p95_ms'] - before) / before if before else 0
+            self.stdout.write(
+                f'{name:18} p95 {before:7.1f} -> {result["p95_ms"]:7.1f} мс '
+                f'({change:+.0%}), запросов к БД '
+                f'{previous[name]["queries_mean"]:.1f} -> '
+                f'{result["queries_mean"]:.1f}'
+            )
@@ -0,0 +1,138 @@
+import json
+import os
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from core import signals
+from posts.models import Comment, Follow, Post
+
+from .benchmark import RESULTS_DIR, percentile
+
+User = get_user_model()
+
+# SQLite без настройки: журнал отката и полная синхронизация
+BASELINE_PRAGMAS = {'journal_mode': 'DELETE', 'synchronous': 'FULL'}
+
+PREFIX = 'bench_writer_'
+
+
+class Command(BaseCommand):
+    help = ('Измеряет пропускную способность конкурентной записи: посты, '
+            'комментарии и подписки из нескольких потоков')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--writes', type=int, default=50,
+                            help='Записей на поток')
+        parser.add_argument('--output')
+        parser.add_argument('--keep', action='store_true',
+                            help='Не удалять созданные данные')
+
+    def handle(self, *args, **options):
+        writers = [
+            User.objects.get_or_create(username=f'{PREFIX}{i}')[0]
+            for i in range(options['threads'])
+        ]
+        target = Post.objects.create(author=writers[0], text='Цель записи')
+        results = {}
+        try:
+            if connection.vendor == 'sqlite':
+                results['baseline'] = self.baseline(writers, target, options)
+            results['tuned'] = self.run(writers, target, options)
+        finally:
+            signals.tuning_enabled = True
+            connection.close()
+            if not options['keep']:
+                User.objects.filter(username__startswith=PREFIX).delete()
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:9} {result["writes_per_second"]:8.1f} записей/с  '
+                f'p95 {result["p95_ms"]:7.1f} мс  '
+                f'ошибок {result["errors"]}'
+            )
+        if 'baseline' in results and results['baseline']['writes_per_second']:
+            speedup = (results['tuned']['writes_per_second']
+                       / results['baseline']['writes_per_second'])
+            self.stdout.write(f'Ускорение: {speedup:.2f}x')
+        path = options['output'] or os.path.join(
+            RESULTS_DIR, f'writes-{timezone.now():%Y%m%d-%H%M%S}.json')
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as file:
+            json.dump({
+                'started': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'threads': options['threads'],
+                'writes': options['writes'],
+                'results': results,
+            }, file, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'Результаты: {path}'))
+
+    def baseline(self, writers, target, options):
+        # новые соединения не получат PRAGMA из core.signals
+        signals.tuning_enabled = False
+        connection.close()
+        with connection.cursor() as cursor:
+            signals.apply_pragmas(cursor, BASELINE_PRAGMAS)
+        connection.close()
+        try:
+            return self.run(writers, target, options)
+        finally:
+            signals.tuning_enabled = True
+            connection.close()
+
+    def run(self, writers, target, options):
+        latencies, errors = [], []
+        lock = threading.Lock()
+
+        def work(writer):
+            own = []
+            failed = 0
+            try:
+                for i in range(options['writes']):
+                    started = time.perf_counter()
+                    try:
+                        with transaction.atomic():
+                            self.write(writer, target, i)
+                    except DatabaseError:
+                        failed += 1
+                    own.append(time.perf_counter() - started)
+            finally:
+                connection.close()
+                with lock:
+                    latencies.extend(own)
+                    errors.append(failed)
+
+        threads = [threading.Thread(target=work, args=(writer,))
+                   for writer in writers]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        done = len(latencies) - sum(errors)
+        return {
+            'writes_per_second': done / elapsed if elapsed else 0.0,
+            'p50_ms': 1000 * percentile(latencies, 0.5),
+            'p95_ms': 1000 * percentile(latencies, 0.95),
+            'errors': sum(errors),
+        }
+
+    def write(self, writer, target, i):
+        """Те же записи, что делают post_create, add_comment и
+        profile_follow/profile_unfollow."""
+        kind = i % 3
+        if kind == 0:
+            Post.objects.create(author=writer, text=f'Пост {i}')
+        elif kind == 1:
+            Comment.objects.create(post=target, author=writer,
+                                   text=f'Комментарий {i}')
+        elif writer != target.author:
+            follow = Follow.objects.filter(user=writer, author=target.author)
+            if not follow.delete()[0]:
+                Follow.objects.create(user=writer, author=target.author)
@@ -0,0 +1,62 @@
+import hashlib
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+from django.utils import timezone
+
+from posts.models import Post
+from posts.uploads import UPLOAD_TO
+
+
+class Command(BaseCommand):
+    help = ('Находит одинаковые файлы в media/posts/, переводит посты на '
+            'один из них и удаляет копии')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только показать, что будет удалено')
+
+    def handle(self, *args, **options):
+        groups = defaultdict(list)
+        for name in self.walk(UPLOAD_TO.rstrip('/')):
+            groups[self.digest(name)].append(name)
+        files = saved = repointed = 0
+        for names in groups.values():
+            if len(names) < 2:
+                continue
+            keep, *copies = sorted(names)
+            for name in copies:
+                size = default_storage.size(name)
+                self.stdout.write(f'{name} -> {keep}')
+                files += 1
+                saved += size
+                if options['dry_run']:
+                    continue
+                # новая отметка изменения сбрасывает карточки постов
+                repointed += Post.objects.filter(image=name).update(
+                    image=keep, updated=timezone.now())
+                default_storage.delete(name)
+        if repointed:
+            cache.clear()
+        self.stdout.write(self.style.SUCCESS(
+            f'Копий: {files}, освобождено {filesizeformat(saved)}, '
+            f'постов переведено: {repointed}'))
+
+    def walk(self, path):
+        if not default_storage.exists(path):
+            return
+        directories, files = default_storage.listdir(path)
+        for name in sorted(files):
+            yield f'{path}/{name}'
+        for directory in sorted(directories):
+            yield from self.walk(f'{path}/{directory}')
+
+    def digest(self, name):
+        sha256 = hashlib.sha256()
+        with default_storage.open(name) as file:
+            for chunk in file.chunks():
+                sha256.update(chunk)
+        return sha256.hexdigest()
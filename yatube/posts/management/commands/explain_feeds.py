@@ -0,0 +1,82 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from posts import feeds
+from posts.models import Group, Post, User
+from posts.paginators import BACKWARD, FORWARD, LAST, CursorPaginator
+from yatube.settings import MAX_POSTS
+
+# полный проход по таблице и сортировка во временном B-дереве
+PROBLEMS = (
+    re.compile(r'\bSCAN\b(?!.*\bINDEX\b)'),
+    re.compile(r'\bTEMP B-TREE\b'),
+    re.compile(r'\bSeq Scan\b'),
+    re.compile(r'\bSort\b'),
+)
+
+
+def feed_querysets():
+    """Запросы всех лент с параметрами их пагинации."""
+    # планы не зависят от конкретных id, поэтому объекты не сохраняются
+    group, user, post = Group(pk=0), User(pk=0), Post(pk=0)
+    return {
+        'index': (feeds.index_posts(), feeds.FEED_ORDER),
+        'group_posts': (feeds.group_posts(group), feeds.FEED_ORDER),
+        'profile': (feeds.profile_posts(user), feeds.FEED_ORDER),
+        'follow_index': (feeds.follow_posts(user), feeds.FOLLOW_ORDER),
+        'post_comments': (feeds.post_comments(post), feeds.COMMENTS_ORDER),
+    }
+
+
+def page_querysets(queryset, order):
+    paginator = CursorPaginator(queryset, MAX_POSTS, **order)
+    now = timezone.now()
+    return {
+        'first': paginator.page_queryset(),
+        'next': paginator.page_queryset(
+            paginator.make_cursor(FORWARD, now, 0)),
+        'previous': paginator.page_queryset(
+            paginator.make_cursor(BACKWARD, now, 0)),
+        'last': paginator.page_queryset(LAST),
+    }
+
+
+def problems(plan):
+    return [line for line in plan.splitlines()
+            if any(pattern.search(line) for pattern in PROBLEMS)]
+
+
+class Command(BaseCommand):
+    help = ('Показывает планы запросов лент и находит полные проходы '
+            'по таблицам и сортировки во временных B-деревьях')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'feeds', nargs='*',
+            help='Какие ленты проверять: ' + ', '.join(feed_querysets()),
+        )
+
+    def handle(self, *args, **options):
+        querysets = feed_querysets()
+        names = options['feeds'] or list(querysets)
+        unknown = set(names) - set(querysets)
+        if unknown:
+            raise CommandError(f'Неизвестные ленты: {", ".join(unknown)}')
+        found = []
+        for name in names:
+            queryset, order = querysets[name]
+            for page, page_queryset in page_querysets(
+                    queryset, order).items():
+                plan = page_queryset.explain()
+                self.stdout.write(f'{name} ({page}):')
+                bad = problems(plan)
+                for line in plan.splitlines():
+                    mark = '!!' if line in bad else '  '
+                    self.stdout.write(f'{mark} {line}')
+                found += [f'{name} ({page}): {line}' for line in bad]
+        if found:
+            raise CommandError(
+                'Запросы без подходящего индекса:\n' + '\n'.join(found))
+        self.stdout.write('Все ленты читаются по индексам')
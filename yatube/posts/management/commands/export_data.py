@@ -0,0 +1,113 @@
+import csv
+import json
+import os
+import shutil
+import time
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from posts.models import Comment, Follow, Group, Post
+
+FORMATS = ('ndjson', 'csv')
+
+# файл, модель, колонки и поля для values_list; пользователи и группы
+# пишутся по username и slug, у постов и комментариев остаются id
+TABLES = (
+    ('groups', Group, ('title', 'slug', 'description'),
+     ('title', 'slug', 'description')),
+    ('posts', Post,
+     ('id', 'text', 'pub_date', 'updated', 'author', 'group', 'image'),
+     ('id', 'text', 'pub_date', 'updated', 'author__username',
+      'group__slug', 'image')),
+    ('comments', Comment, ('id', 'post', 'author', 'text', 'created'),
+     ('id', 'post_id', 'author__username', 'text', 'created')),
+    ('follows', Follow, ('user', 'author'),
+     ('user__username', 'author__username')),
+)
+
+MEDIA_DIR = 'media'
+
+
+class Progress:
+    """Печатает число строк и скорость раз в every строк."""
+    def __init__(self, stdout, name, every):
+        self.stdout = stdout
+        self.name = name
+        self.every = every
+        self.rows = 0
+        self.started = time.monotonic()
+
+    def rate(self):
+        elapsed = time.monotonic() - self.started
+        return self.rows / elapsed if elapsed else 0.0
+
+    def add(self, rows=1):
+        before = self.rows // self.every
+        self.rows += rows
+        if self.rows // self.every > before:
+            self.stdout.write(
+                f'{self.name}: {self.rows} строк, {self.rate():.0f} строк/с')
+
+    def done(self):
+        self.stdout.write(
+            f'{self.name}: готово {self.rows} строк, '
+            f'{self.rate():.0f} строк/с')
+
+
+def encode(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+class Command(BaseCommand):
+    help = ('Потоково выгружает группы, посты, комментарии и подписки в '
+            'NDJSON или CSV, картинки копируются в media/ рядом')
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory')
+        parser.add_argument('--format', choices=FORMATS, default='ndjson')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--no-images', action='store_true')
+
+    def handle(self, *args, **options):
+        directory = options['directory']
+        os.makedirs(directory, exist_ok=True)
+        for name, model, columns, fields in TABLES:
+            path = os.path.join(directory, f'{name}.{options["format"]}')
+            rows = (
+                model.objects.order_by('pk').values_list(*fields)
+                .iterator(chunk_size=options['chunk_size'])
+            )
+            progress = Progress(self.stdout, name, options['chunk_size'])
+            with open(path, 'w', newline='', encoding='utf-8') as file:
+                write = self.writer(file, options['format'], columns)
+                for row in rows:
+                    row = dict(zip(columns, map(encode, row)))
+                    write(row)
+                    if row.get('image') and not options['no_images']:
+                        self.copy_image(row['image'], directory)
+                    progress.add()
+            progress.done()
+        self.stdout.write(self.style.SUCCESS(f'Выгружено в {directory}'))
+
+    def writer(self, file, format, columns):
+        if format == 'csv':
+            writer = csv.DictWriter(file, columns)
+            writer.writeheader()
+            return writer.writerow
+        return lambda row: file.write(
+            json.dumps(row, ensure_ascii=False) + '\n')
+
+    def copy_image(self, name, directory):
+        target = os.path.join(directory, MEDIA_DIR, name)
+        # одна картинка может быть у многих постов
+        if os.path.exists(target) or not default_storage.exists(name):
+            return
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with default_storage.open(name) as source, \
+                open(target, 'wb') as file:
+            shutil.copyfileobj(source, file)
@@ -0,0 +1,30 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from yatube.settings import THUMBNAIL_WORKERS
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Готовит миниатюры для всех уже загруженных картинок постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=THUMBNAIL_WORKERS)
+
+    def handle(self, *args, **options):
+        post_ids = (
+            Post.objects.exclude(image='').order_by('pk')
+            .values_list('pk', flat=True).iterator(chunk_size=1000)
+        )
+        started = time.monotonic()
+        done = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            for _ in pool.map(thumbnails.process_post_safely, post_ids):
+                done += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано постов: {done} за {time.monotonic() - started:.1f} с'
+        ))
@@ -0,0 +1,85 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.template.defaultfilters import filesizeformat
+
+from yatube.settings import MAX_POSTS
+
+from posts import feeds, thumbnails
+from posts.paginators import CursorPaginator
+
+
+def url_size(url):
+    name = url[len(settings.MEDIA_URL):]
+    if not default_storage.exists(name):
+        return None
+    return default_storage.size(name)
+
+
+class Command(BaseCommand):
+    help = ('Считает по страницам главной ленты, сколько байт картинок '
+            'экономят адаптивные варианты миниатюр для заданного экрана')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=5)
+        parser.add_argument('--viewport', type=int, default=360,
+                            help='Ширина экрана в CSS-пикселях')
+        parser.add_argument('--dpr', type=float, default=2,
+                            help='Плотность пикселей экрана')
+        parser.add_argument('--alias', default='card')
+
+    def handle(self, *args, **options):
+        alias = options['alias']
+        if alias not in settings.THUMBNAIL_GEOMETRIES:
+            raise CommandError(f'Неизвестный размер {alias}')
+        width = self.pick_width(alias, options)
+        variant = thumbnails.variant_alias(alias, width,
+                                           thumbnails.FORMATS[0])
+        self.stdout.write(f'Вариант для экрана: {variant}')
+        paginator = CursorPaginator(feeds.index_posts(), MAX_POSTS)
+        cursor = None
+        total_before = total_after = 0
+        for number in range(1, options['pages'] + 1):
+            page = paginator.get_cursor_page(cursor)
+            before, after, missing = self.measure(page, alias, variant)
+            total_before += before
+            total_after += after
+            self.report(f'Страница {number}', before, after, missing)
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        self.report('Всего', total_before, total_after, 0)
+
+    def pick_width(self, alias, options):
+        """Самая узкая ширина, которой хватает экрану, как выбрал бы
+        браузер по srcset."""
+        needed = min(options['viewport'], thumbnails.size(alias)[0])
+        needed *= options['dpr']
+        widths = thumbnails.widths(alias)
+        return next((width for width in widths if width >= needed),
+                    widths[-1])
+
+    def measure(self, page, alias, variant):
+        names = [post.image.name for post in page if post.image]
+        thumbnails.preload(names)
+        before = after = missing = 0
+        for name in names:
+            sizes = [
+                url and url_size(url) for url in (
+                    thumbnails.find_url(thumbnails.url_key(name, alias)),
+                    thumbnails.find_url(thumbnails.url_key(name, variant)))
+            ]
+            if None in sizes:
+                missing += 1
+                continue
+            before += sizes[0]
+            after += sizes[1]
+        return before, after, missing
+
+    def report(self, title, before, after, missing):
+        saved = 1 - after / before if before else 0
+        line = (f'{title}: было {filesizeformat(before)}, стало '
+                f'{filesizeformat(after)}, экономия {saved:.0%}')
+        if missing:
+            line += f', без миниатюр: {missing}'
+        self.stdout.write(line)
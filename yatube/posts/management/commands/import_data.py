@@ -0,0 +1,189 @@
+import csv
+import json
+import os
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection
+from django.utils.dateparse import parse_datetime
+
+from posts import search
+from posts.models import Comment, Follow, Group, Post
+
+from .export_data import FORMATS, MEDIA_DIR, TABLES, Progress
+from .seed_data import manual_dates
+
+User = get_user_model()
+
+# строки с явными id и поля, по которым строка из выгрузки узнаётся в
+# базе
+NATURAL_FIELDS = (
+    ('posts', Post, ('author__username', 'pub_date', 'text'),
+     lambda row: (row['author'], parse_datetime(row['pub_date']),
+                  row['text'])),
+    ('comments', Comment, ('post_id', 'author__username', 'created', 'text'),
+     lambda row: (int(row['post']), row['author'],
+                  parse_datetime(row['created']), row['text'])),
+)
+
+
+def chunks(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Command(BaseCommand):
+    help = ('Потоково загружает выгрузку export_data пачками bulk_create. '
+            'Посты и комментарии сохраняют id, поэтому повторный импорт '
+            'пропускает уже загруженные строки, а если id занят другой '
+            'записью, импорт не начинается. Неизвестные авторы '
+            'создаются без пароля')
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--skip-rebuild', action='store_true',
+            help='Не пересобирать счётчики, ленты и поисковый индекс',
+        )
+
+    def handle(self, *args, **options):
+        self.directory = options['directory']
+        format = self.detect_format()
+        self.check_ids(format, options['batch_size'])
+        for name, model, columns, fields in TABLES:
+            path = os.path.join(self.directory, f'{name}.{format}')
+            progress = Progress(self.stdout, name, options['batch_size'])
+            with open(path, newline='', encoding='utf-8') as file:
+                for batch in chunks(self.reader(file, format),
+                                    options['batch_size']):
+                    getattr(self, f'load_{name}')(batch)
+                    progress.add(len(batch))
+            progress.done()
+        # явные id не двигают последовательности PostgreSQL
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                    no_style(), [Post, Comment]):
+                cursor.execute(sql)
+        if not options['skip_rebuild']:
+            # bulk_create не шлёт сигналы: производные данные собираются
+            # заново
+            call_command('reconcile_counters', stdout=self.stdout)
+            call_command('rebuild_timelines', stdout=self.stdout)
+            if search.available():
+                call_command('rebuild_search_index', stdout=self.stdout)
+        cache.clear()
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено из {self.directory}'))
+
+    def detect_format(self):
+        for format in FORMATS:
+            if os.path.exists(os.path.join(self.directory,
+                                           f'posts.{format}')):
+                return format
+        raise CommandError(f'В {self.directory} нет выгрузки export_data')
+
+    def check_ids(self, format, batch_size):
+        """Падает, если id из выгрузки заняты чужими постами или
+        комментариями.
+
+        Совпавшая по содержимому запись считается уже загруженной.
+        Проверка идёт до загрузки, чтобы не оставить базу наполовину
+        импортированной.
+        """
+        for name, model, fields, natural in NATURAL_FIELDS:
+            path = os.path.join(self.directory, f'{name}.{format}')
+            with open(path, newline='', encoding='utf-8') as file:
+                for batch in chunks(self.reader(file, format), batch_size):
+                    rows = {int(row['id']): natural(row) for row in batch}
+                    clashes = [
+                        pk for pk, *values in model.objects.filter(
+                            pk__in=rows).values_list('pk', *fields)
+                        if tuple(values) != rows[pk]
+                    ]
+                    if clashes:
+                        raise CommandError(
+                            f'{name}: id {", ".join(map(str, clashes))} '
+                            f'уже заняты другими записями. Импорт '
+                            f'переносит id, поэтому грузите выгрузку в '
+                            f'пустую базу')
+
+    def reader(self, file, format):
+        if format == 'csv':
+            return csv.DictReader(file)
+        return (json.loads(line) for line in file if line.strip())
+
+    def user_ids(self, usernames):
+        usernames = set(usernames)
+        known = dict(User.objects.filter(username__in=usernames)
+                     .values_list('username', 'pk'))
+        missing = usernames - set(known)
+        if missing:
+            User.objects.bulk_create([
+                User(username=username, password=make_password(None))
+                for username in missing
+            ], ignore_conflicts=True)
+            known.update(User.objects.filter(username__in=missing)
+                         .values_list('username', 'pk'))
+        return known
+
+    def restore_image(self, name):
+        source = os.path.join(self.directory, MEDIA_DIR, name)
+        if not name or default_storage.exists(name) or \
+                not os.path.exists(source):
+            return name
+        with open(source, 'rb') as file:
+            return default_storage.save(name, File(file))
+
+    def load_groups(self, rows):
+        Group.objects.bulk_create([
+            Group(title=row['title'], slug=row['slug'],
+                  description=row['description'])
+            for row in rows
+        ], ignore_conflicts=True)
+
+    def load_posts(self, rows):
+        authors = self.user_ids(row['author'] for row in rows)
+        groups = dict(Group.objects.filter(
+            slug__in={row['group'] for row in rows if row['group']},
+        ).values_list('slug', 'pk'))
+        with manual_dates(Post, 'pub_date', 'updated'):
+            Post.objects.bulk_create([
+                Post(id=int(row['id']), text=row['text'],
+                     pub_date=parse_datetime(row['pub_date']),
+                     updated=parse_datetime(row['updated']),
+                     author_id=authors[row['author']],
+                     group_id=groups.get(row['group']),
+                     image=self.restore_image(row['image']))
+                for row in rows
+            ], ignore_conflicts=True)
+
+    def load_comments(self, rows):
+        authors = self.user_ids(row['author'] for row in rows)
+        with manual_dates(Comment, 'created'):
+            Comment.objects.bulk_create([
+                Comment(id=int(row['id']), post_id=int(row['post']),
+                        author_id=authors[row['author']], text=row['text'],
+                        created=parse_datetime(row['created']))
+                for row in rows
+            ], ignore_conflicts=True)
+
+    def load_follows(self, rows):
+        users = self.user_ids(
+            name for row in rows for name in (row['user'], row['author']))
+        Follow.objects.bulk_create([
+            Follow(user_id=users[row['user']],
+                   author_id=users[row['author']])
+            for row in rows
+        ], ignore_conflicts=True)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts import page_cache
+
+
+class Command(BaseCommand):
+    help = 'Показывает попадания и промахи кэша страниц лент'
+
+    def handle(self, *args, **options):
+        stats = page_cache.stats()
+        self.stdout.write(
+            f'hits: {stats["hits"]}, misses: {stats["misses"]}, '
+            f'hit ratio: {stats["hit_ratio"]:.1%}'
+        )
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает полнотекстовый индекс постов и комментариев'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if not search.available():
+            raise CommandError('Индекс FTS5 доступен только для SQLite')
+        started = time.monotonic()
+        with transaction.atomic():
+            total = search.rebuild(options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано записей: {total} '
+            f'за {time.monotonic() - started:.1f} с'
+        ))
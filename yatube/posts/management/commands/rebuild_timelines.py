@@ -0,0 +1,32 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from yatube.settings import TIMELINE_BATCH_SIZE
+
+from posts import timelines
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает материализованные ленты подписок всех пользователей'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--trim-only', action='store_true',
+            help='Только обрезать ленты до TIMELINE_DEPTH',
+        )
+
+    def handle(self, *args, **options):
+        action = timelines.trim if options['trim_only'] else timelines.rebuild
+        user_ids = (
+            User.objects.order_by('pk')
+            .values_list('pk', flat=True)
+            .iterator(chunk_size=TIMELINE_BATCH_SIZE)
+        )
+        total = 0
+        for user_id in user_ids:
+            action(user_id)
+            total += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано лент: {total}'))
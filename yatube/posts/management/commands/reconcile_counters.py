@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Сверяет денормализованные счётчики с базой и чинит расхождения'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'kinds', nargs='*',
+            help='Какие счётчики сверять: ' + ', '.join(counters.SOURCES),
+        )
+
+    def handle(self, *args, **options):
+        kinds = options['kinds'] or list(counters.SOURCES)
+        unknown = set(kinds) - set(counters.SOURCES)
+        if unknown:
+            raise CommandError(f'Неизвестные счётчики: {", ".join(unknown)}')
+        for kind in kinds:
+            fixed = counters.reconcile(kind)
+            self.stdout.write(f'{kind}: исправлено {fixed}')
@@ -0,0 +1,188 @@
+import io
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from PIL import Image
+
+from posts import counters, search, timelines
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+WORDS = (
+    'утро вечер город море лес дорога книга музыка кофе работа отпуск '
+    'друзья кино фото погода проект код релиз тест кошка собака'
+).split()
+
+PASSWORD = 'seed-password'
+
+
+@contextmanager
+def manual_dates(model, *names):
+    """Даёт задать даты полям с auto_now/auto_now_add при вставке."""
+    fields = [model._meta.get_field(name) for name in names]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу синтетическими пользователями, группами, '
+            'постами, комментариями и подписками')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--comments', type=int, default=3000)
+        parser.add_argument('--follows', type=int, default=1000)
+        parser.add_argument(
+            '--images', type=float, default=0.2,
+            help='Доля постов с картинкой',
+        )
+        parser.add_argument('--days', type=int, default=365,
+                            help='За сколько дней раскидать даты постов')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--prefix', default='seed')
+        parser.add_argument('--seed', type=int, default=None,
+                            help='Зерно генератора для повторяемых данных')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.prefix = options['prefix']
+        self.now = timezone.now()
+        self.span = timedelta(days=options['days'])
+
+        user_ids = self.create_users(options['users'])
+        group_ids = self.create_groups(options['groups'])
+        images = self.create_images() if options['images'] else []
+        post_ids = self.create_posts(
+            options['posts'], user_ids, group_ids, images, options['images'])
+        self.create_comments(options['comments'], user_ids, post_ids)
+        self.create_follows(options['follows'], user_ids)
+
+        # bulk_create не шлёт сигналы: производные данные собираются заново
+        for kind in counters.SOURCES:
+            counters.reconcile(kind)
+        for user_id in user_ids:
+            timelines.rebuild(user_id)
+        if search.available():
+            search.rebuild()
+        cache.clear()
+        self.stdout.write(self.style.SUCCESS(
+            f'Пользователи: {len(user_ids)}, группы: {len(group_ids)}, '
+            f'посты: {len(post_ids)}, пароль: {PASSWORD}. '
+            'Миниатюры готовит generate_thumbnails.'
+        ))
+
+    def bulk_create(self, model, objects, **kwargs):
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                model.objects.bulk_create(batch, **kwargs)
+                batch = []
+        model.objects.bulk_create(batch, **kwargs)
+
+    def random_date(self):
+        return self.now - self.span * self.rng.random()
+
+    def create_users(self, total):
+        start = User.objects.filter(username__startswith=self.prefix).count()
+        password = make_password(PASSWORD)
+        names = [f'{self.prefix}{start + i}' for i in range(total)]
+        self.bulk_create(User, (
+            User(username=name, password=password, first_name=name.title())
+            for name in names
+        ))
+        return list(User.objects.filter(username__in=names)
+                    .values_list('pk', flat=True))
+
+    def create_groups(self, total):
+        start = Group.objects.filter(slug__startswith=self.prefix).count()
+        slugs = [f'{self.prefix}-{start + i}' for i in range(total)]
+        self.bulk_create(Group, (
+            Group(title=text(self.rng, 2), slug=slug,
+                  description=text(self.rng, 10))
+            for slug in slugs
+        ))
+        return list(Group.objects.filter(slug__in=slugs)
+                    .values_list('pk', flat=True))
+
+    def create_images(self, total=10):
+        """Несколько картинок, общих для всех постов с картинкой."""
+        names = []
+        for i in range(total):
+            color = tuple(self.rng.randrange(256) for _ in range(3))
+            buffer = io.BytesIO()
+            Image.new('RGB', (1280, 720), color).save(buffer, 'JPEG')
+            names.append(default_storage.save(
+                f'posts/{self.prefix}-{i}.jpg', ContentFile(buffer.getvalue())
+            ))
+        return names
+
+    def create_posts(self, total, user_ids, group_ids, images, share):
+        if not user_ids:
+            return []
+        started = Post.objects.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0
+        with manual_dates(Post, 'pub_date', 'updated'):
+            posts = []
+            for _ in range(total):
+                pub_date = self.random_date()
+                posts.append(Post(
+                    text=text(self.rng, self.rng.randint(5, 60)),
+                    author_id=self.rng.choice(user_ids),
+                    group_id=(self.rng.choice(group_ids)
+                              if group_ids and self.rng.random() < 0.7
+                              else None),
+                    image=(self.rng.choice(images)
+                           if images and self.rng.random() < share else ''),
+                    pub_date=pub_date,
+                    updated=pub_date,
+                ))
+            self.bulk_create(Post, posts)
+        return list(Post.objects.filter(pk__gt=started)
+                    .values_list('pk', flat=True))
+
+    def create_comments(self, total, user_ids, post_ids):
+        if not user_ids or not post_ids:
+            return
+        with manual_dates(Comment, 'created'):
+            self.bulk_create(Comment, (
+                Comment(post_id=self.rng.choice(post_ids),
+                        author_id=self.rng.choice(user_ids),
+                        text=text(self.rng, self.rng.randint(3, 20)),
+                        created=self.random_date())
+                for _ in range(total)
+            ))
+
+    def create_follows(self, total, user_ids):
+        if len(user_ids) < 2:
+            return
+        pairs = set()
+        for _ in range(total):
+            user_id, author_id = self.rng.sample(user_ids, 2)
+            pairs.add((user_id, author_id))
+        self.bulk_create(Follow, (
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id, author_id in pairs
+        ), ignore_conflicts=True)
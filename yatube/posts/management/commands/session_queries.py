@@ -0,0 +1,61 @@
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Group, Post
+
+from .benchmark import Command as BenchmarkCommand
+
+ENGINES = ('db', 'cached_db', 'cache', 'signed_cookies')
+
+
+class Command(BenchmarkCommand):
+    help = ('Считает запросы к базе на каждый читающий GET-адрес posts '
+            'для вошедшего пользователя при разных хранилищах сессий')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=3,
+                            help='Запросов на каждый адрес')
+        parser.add_argument('--user', help='Под кем заходить на сайт')
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        post = Post.objects.order_by('-pk').first()
+        group = Group.objects.order_by('pk').first()
+        if post is None or group is None:
+            raise CommandError('Нет данных: сначала запустите seed_data')
+        # пишущие адреса scenarios уже пропустил
+        urls = {name: url for name, (url, _)
+                in self.scenarios(post, group).items()}
+        self.stdout.write(f'{"":24}' + ''.join(
+            f'{engine:>16}' for engine in ENGINES))
+        totals = dict.fromkeys(ENGINES, 0)
+        for name, url in urls.items():
+            line = f'{name:24}'
+            for engine in ENGINES:
+                queries, session = self.measure(user, url, engine, options)
+                totals[engine] += queries
+                line += f'{queries:>10.1f} ({session:.0f})'
+            self.stdout.write(line)
+        self.stdout.write(f'{"всего":24}' + ''.join(
+            f'{totals[engine]:>16.1f}' for engine in ENGINES))
+        self.stdout.write('В скобках — запросы к django_session')
+
+    def measure(self, user, url, engine, options):
+        """Среднее число запросов и из них к таблице сессий."""
+        with override_settings(
+                SESSION_ENGINE=f'django.contrib.sessions.backends.{engine}'):
+            # промежуточный слой сессий берёт движок при создании клиента
+            client = Client()
+            client.force_login(user)
+            client.get(url)
+            queries = session = 0
+            for _ in range(options['requests']):
+                with CaptureQueriesContext(connection) as captured:
+                    client.get(url)
+                queries += len(captured)
+                session += sum('django_session' in query['sql']
+                               for query in captured.captured_queries)
+        return (queries / options['requests'],
+                session / options['requests'])
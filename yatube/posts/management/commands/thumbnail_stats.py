@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Показывает метрики миниатюр: попадания и время генерации'
+
+    def handle(self, *args, **options):
+        stats = thumbnails.stats()
+        self.stdout.write(
+            f'hits: {stats["hits"]}, misses: {stats["misses"]}, '
+            f'hit ratio: {stats["hit_ratio"]:.1%}\n'
+            f'generated: {stats["generated"]}, '
+            f'avg generation: {stats["avg_generation_ms"]:.1f} ms'
+        )
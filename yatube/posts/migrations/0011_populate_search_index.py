@@ -0,0 +1,45 @@
+from django.db import migrations
+
+CHUNK_SIZE = 1000
+
+
+def populate_index(apps, schema_editor):
+    """Заполняет индекс уже существующими постами и комментариями:
+    0008 создала его пустым."""
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    from posts.search import TABLE, normalize
+
+    sources = (
+        (apps.get_model('posts', 'Post').objects.values_list(
+            'pk', 'pk', 'text'), 0),
+        (apps.get_model('posts', 'Comment').objects.values_list(
+            'pk', 'post_id', 'text'), 1),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+        for queryset, shift in sources:
+            rows = []
+            for pk, post_id, text in queryset.order_by().iterator(
+                    chunk_size=CHUNK_SIZE):
+                rows.append((2 * pk + shift, normalize(text), post_id))
+                if len(rows) >= CHUNK_SIZE:
+                    cursor.executemany(
+                        f'INSERT INTO {TABLE} (rowid, body, post_id) '
+                        'VALUES (%s, %s, %s)', rows)
+                    rows = []
+            cursor.executemany(
+                f'INSERT INTO {TABLE} (rowid, body, post_id) '
+                'VALUES (%s, %s, %s)', rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_notification'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_index, migrations.RunPython.noop),
+    ]
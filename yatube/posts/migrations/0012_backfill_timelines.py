@@ -0,0 +1,43 @@
+from django.db import migrations
+
+from yatube.settings import TIMELINE_BATCH_SIZE, TIMELINE_DEPTH
+
+
+def backfill_timelines(apps, schema_editor):
+    """Собирает ленты существующих подписчиков: 0005 создала таблицу
+    пустой, а follow_index читает только её."""
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    user_ids = list(
+        Follow.objects.order_by('user_id')
+        .values_list('user_id', flat=True).distinct()
+    )
+    batch = []
+    for user_id in user_ids:
+        posts = (
+            Post.objects.filter(author__following__user_id=user_id)
+            .order_by('-pub_date', '-pk')
+            .values_list('pk', 'pub_date')[:TIMELINE_DEPTH]
+        )
+        batch.extend(
+            TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+            for pk, pub_date in posts
+        )
+        if len(batch) >= TIMELINE_BATCH_SIZE:
+            TimelineEntry.objects.bulk_create(
+                batch, batch_size=TIMELINE_BATCH_SIZE, ignore_conflicts=True)
+            batch = []
+    TimelineEntry.objects.bulk_create(
+        batch, batch_size=TIMELINE_BATCH_SIZE, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_populate_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_timelines, migrations.RunPython.noop),
+    ]
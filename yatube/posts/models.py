@@ -24,6 +24,10 @@ class Post(models.Model):
         verbose_name='Дата публикации',
         auto_now_add=True
     )
+    updated = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True
+    )
     author = models.ForeignKey(User, on_delete=models.CASCADE,
                                related_name='posts')
 
@@ -38,6 +42,15 @@ class Post(models.Model):
 
     class Meta:
         ordering = ['-pub_date']
+        # ленты сортируются по (pub_date, id), см. CursorPaginator
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='post_pub_date_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_pub_date_idx'),
+        ]
 
     def __str__(self):
         # выводим текст поста
@@ -72,6 +85,78 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['created']
+        indexes = [
+            models.Index(fields=['post', 'created', 'id'],
+                         name='comment_post_created_idx'),
+        ]
 
     def __str__(self):
         return 'Comment by {} on {}'.format(self.author, self.post)
+
+
+class TimelineEntry(models.Model):
+    """Запись материализованной ленты подписок пользователя."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name='timeline')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name='timeline_entries')
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-pub_date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_user_post'
+            ),
+        ]
+        indexes = [
+            # id поста в конце индекса нужен для сортировки ленты
+            # по (pub_date, post) без временного B-дерева
+            models.Index(fields=['user', '-pub_date', '-post'],
+                         name='timeline_user_feed_idx'),
+        ]
+
+
+class Notification(models.Model):
+    """Уведомление подписчика о новом посте автора."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name='notifications')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name='notifications')
+    created = models.DateTimeField(auto_now_add=True)
+    is_read = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ['-created']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_notification_user_post'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-created', '-id'],
+                         name='notification_user_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user} <- {self.post_id}'
+
+
+class Counter(models.Model):
+    """Денормализованный счётчик: посты автора, комментарии поста и т.п."""
+    kind = models.CharField(max_length=32)
+    object_id = models.PositiveIntegerField()
+    value = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'object_id'],
+                name='unique_counter_kind_object'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.kind}:{self.object_id}={self.value}'
@@ -0,0 +1,126 @@
+"""Уведомления подписчиков о новых постах.
+
+Новый пост раскладывается по подписчикам автора пачками по
+NOTIFICATION_BATCH_SIZE: id подписчиков читаются потоково, поэтому
+память не зависит от их числа. Для больших авторов рассылка уходит в
+очередь core.jobs. Число непрочитанных хранится в счётчике
+counters.UNREAD_NOTIFICATIONS, а перед ним — в кэше, который
+сбрасывается при каждом изменении.
+"""
+from django.core.cache import cache
+from django.db import transaction
+
+from core import jobs, routers
+from yatube.settings import (NOTIFICATION_BATCH_SIZE,
+                             NOTIFICATION_SYNC_FANOUT, UNREAD_COUNT_TIMEOUT)
+
+from . import counters
+from .models import Notification, Post
+from .timelines import iter_follower_ids
+
+
+def _unread_key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def forget_unread(user_ids):
+    """Сбрасывает закэшированные числа непрочитанных.
+
+    Как и page_cache.bump, сброс повторяется после коммита.
+    """
+    keys = [_unread_key(user_id) for user_id in user_ids]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def unread_count(user_id):
+    key = _unread_key(user_id)
+    value = cache.get(key)
+    if value is None:
+        with routers.primary_reads():
+            value = counters.get(counters.UNREAD_NOTIFICATIONS, user_id)
+        cache.set(key, value, UNREAD_COUNT_TIMEOUT)
+    return value
+
+
+def _notify(post_id, user_ids):
+    # повтор задачи не должен задвоить уведомления и счётчики
+    with transaction.atomic():
+        done = set(
+            Notification.objects.filter(post_id=post_id, user_id__in=user_ids)
+            .values_list('user_id', flat=True)
+        )
+        fresh = [user_id for user_id in user_ids if user_id not in done]
+        Notification.objects.bulk_create([
+            Notification(user_id=user_id, post_id=post_id)
+            for user_id in fresh
+        ], ignore_conflicts=True)
+        counters.change_many(counters.UNREAD_NOTIFICATIONS, fresh, 1)
+        forget_unread(fresh)
+
+
+@jobs.task('posts.notify_followers')
+def fan_out(post_id, author_id=None):
+    if author_id is None:
+        author_id = Post.objects.filter(pk=post_id).values_list(
+            'author_id', flat=True).first()
+        if author_id is None:
+            return
+    batch = []
+    for user_id in iter_follower_ids(author_id):
+        batch.append(user_id)
+        if len(batch) >= NOTIFICATION_BATCH_SIZE:
+            _notify(post_id, batch)
+            batch = []
+    if batch:
+        _notify(post_id, batch)
+
+
+def notify_followers(post):
+    followers = counters.get(counters.FOLLOWERS, post.author_id)
+    if followers > NOTIFICATION_SYNC_FANOUT:
+        jobs.enqueue('posts.notify_followers', post.pk,
+                     key=f'notify_followers:{post.pk}')
+    elif followers:
+        fan_out(post.pk, post.author_id)
+
+
+def mark_read(user_id, ids=None):
+    """Отмечает прочитанными уведомления ids или все; возвращает число."""
+    unread = Notification.objects.filter(user_id=user_id, is_read=False)
+    if ids is not None:
+        unread = unread.filter(pk__in=ids)
+    with transaction.atomic():
+        changed = unread.update(is_read=True)
+        if changed:
+            counters.change(counters.UNREAD_NOTIFICATIONS, user_id,
+                            -changed)
+    forget_unread([user_id])
+    return changed
+
+
+def clear(user_id):
+    """Удаляет все уведомления пользователя."""
+    with transaction.atomic():
+        deleted = Notification.objects.filter(user_id=user_id).delete()[0]
+        counters.forget(counters.UNREAD_NOTIFICATIONS, user_id)
+    forget_unread([user_id])
+    return deleted
+
+
+def post_deleting(post):
+    """Списывает непрочитанные уведомления удаляемого поста."""
+    unread = Notification.objects.filter(post=post, is_read=False)
+    counters.change_many(counters.UNREAD_NOTIFICATIONS,
+                         unread.values('user_id'), -1)
+    user_ids = unread.order_by().values_list('user_id', flat=True).iterator(
+        chunk_size=NOTIFICATION_BATCH_SIZE)
+    batch = []
+    for user_id in user_ids:
+        batch.append(user_id)
+        if len(batch) >= NOTIFICATION_BATCH_SIZE:
+            forget_unread(batch)
+            batch = []
+    forget_unread(batch)
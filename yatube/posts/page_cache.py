@@ -0,0 +1,178 @@
+"""Кэш страниц лент с версионированными ключами.
+
+Ключ страницы включает поколения (generation) областей, от которых
+она зависит: 'index', 'group:<slug>', 'profile:<username>',
+'follow:<user_id>'. Сигналы моделей сбрасывают поколения, и старые
+страницы просто перестают находиться, поэтому страницы можно
+хранить долго и не бояться показать устаревшие данные. Это верно
+только для общего кэша (CACHE_BACKEND): в LocMemCache сброс виден
+одному процессу, и страницы с поколениями живут RESET_TIMEOUT.
+"""
+import hashlib
+import time
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+
+from core import routers
+from yatube.settings import (PAGE_CACHE_TIMEOUT, PAGE_GENERATION_TIMEOUT,
+                             REPLICA_PIN_SECONDS)
+
+from .models import Group
+
+HITS_KEY = 'page_cache:hits'
+MISSES_KEY = 'page_cache:misses'
+
+INDEX = 'index'
+
+
+def group_scope(slug):
+    return f'group:{slug}'
+
+
+def profile_scope(username):
+    return f'profile:{username}'
+
+
+def follow_scope(user_id):
+    return f'follow:{user_id}'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def _generation_key(scope):
+    return f'page_cache:gen:{scope}'
+
+
+def _new_generation():
+    # после сброса новое поколение гарантированно отличается от старого
+    return time.time_ns() // 1000
+
+
+def generations(scopes):
+    keys = [_generation_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    missing = {key: _new_generation() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, PAGE_GENERATION_TIMEOUT)
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+def changed_at(scopes):
+    """Время последнего сброса областей.
+
+    Поколение — это время сброса в микросекундах, поэтому оно не
+    раньше последнего изменения данных области.
+    """
+    return datetime.fromtimestamp(max(generations(scopes)) / 10 ** 6,
+                                  timezone.utc)
+
+
+def settled(scopes):
+    """Прошло ли с последнего сброса областей REPLICA_PIN_SECONDS.
+
+    За это время реплика догоняет основную базу, и страницу можно
+    строить по ней.
+    """
+    age = time.time() - max(generations(scopes)) / 10 ** 6
+    return age >= REPLICA_PIN_SECONDS
+
+
+def bump(*scopes):
+    """Сбрасывает поколения областей.
+
+    Сброс повторяется после коммита: иначе между сбросом и коммитом
+    читатель успел бы закэшировать старые данные под новым поколением.
+    """
+    keys = [_generation_key(scope) for scope in scopes]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def bump_post(post, *group_ids):
+    """Сбрасывает кэш общих лент, где виден пост.
+
+    Ленты подписок сбрасывает timelines: новый пост — вместе с
+    раскладкой, изменённый — bump_follow_pages.
+    """
+    slugs = Group.objects.filter(
+        pk__in=[pk for pk in group_ids if pk]).values_list('slug', flat=True)
+    bump(
+        INDEX,
+        profile_scope(post.author.username),
+        post_scope(post.pk),
+        *[group_scope(slug) for slug in slugs]
+    )
+
+
+def _count(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def stats():
+    values = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits = values.get(HITS_KEY, 0)
+    misses = values.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / total if total else 0.0,
+    }
+
+
+def page_key(request, scopes):
+    parts = [request.get_full_path(), str(request.user.pk or 0)]
+    parts += [str(generation) for generation in generations(scopes)]
+    digest = hashlib.md5('|'.join(parts).encode()).hexdigest()
+    return f'page_cache:page:{digest}'
+
+
+def cached_page(*scope_funcs):
+    """Кэширует GET-ответ view до смены поколения любой из областей.
+
+    Каждая функция из scope_funcs получает (request, **kwargs) view
+    и возвращает имя области. В ключ входит и пользователь, так как
+    шапка страницы у каждого своя.
+
+    Промах строится по реплике, если области давно не менялись, иначе
+    по основной базе. Если поколение сменилось во время рендера,
+    страница отдаётся, но в кэш не кладётся.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return view(request, *args, **kwargs)
+            scopes = [func(request, **kwargs) for func in scope_funcs]
+            key = page_key(request, scopes)
+            cached = cache.get(key)
+            if cached is not None:
+                _count(HITS_KEY)
+                content, content_type = cached
+                return HttpResponse(content, content_type=content_type)
+            _count(MISSES_KEY)
+            reads = (nullcontext() if settled(scopes)
+                     else routers.primary_reads())
+            with reads:
+                response = view(request, *args, **kwargs)
+            if (response.status_code == 200 and not response.streaming
+                    and page_key(request, scopes) == key):
+                cache.set(key, (response.content, response['Content-Type']),
+                          PAGE_CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
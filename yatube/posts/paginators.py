@@ -0,0 +1,130 @@
+"""Keyset-пагинация лент по паре (дата, id).
+
+Вместо COUNT(*) и LIMIT/OFFSET каждая страница выбирается
+условием по ключу последней записи предыдущей страницы, поэтому
+глубокие страницы стоят столько же, сколько первая.
+Старые ссылки вида ?page=N продолжают работать через offset.
+"""
+import base64
+import binascii
+
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+FORWARD = 'n'
+BACKWARD = 'p'
+LAST = 'last'
+
+
+class CursorPaginator(Paginator):
+    """Пагинатор по ключу (key, tiebreak), по умолчанию (pub_date, pk).
+
+    count можно передать заранее (например, из счётчика), тогда
+    COUNT(*) не выполняется даже для старых ссылок ?page=N.
+    """
+
+    def __init__(self, object_list, per_page, key='pub_date',
+                 tiebreak='pk', descending=True, count=None, **kwargs):
+        self.key = key
+        self.tiebreak = tiebreak
+        self.descending = descending
+        super().__init__(
+            object_list.order_by(*self._ordering(False)), per_page, **kwargs)
+        if count is not None:
+            self.__dict__['count'] = count
+
+    def _ordering(self, reverse):
+        sign = '-' if self.descending != reverse else ''
+        return f'{sign}{self.key}', f'{sign}{self.tiebreak}'
+
+    def _after(self, value, pk, reverse):
+        lookup = 'lt' if self.descending != reverse else 'gt'
+        return (
+            Q(**{f'{self.key}__{lookup}': value})
+            | Q(**{self.key: value, f'{self.tiebreak}__{lookup}': pk})
+        )
+
+    def make_cursor(self, direction, value, pk):
+        raw = f'{direction}|{value.isoformat()}|{pk}'.encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def encode(self, direction, obj):
+        return self.make_cursor(direction, getattr(obj, self.key),
+                                getattr(obj, self.tiebreak))
+
+    def decode(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            raw = base64.urlsafe_b64decode(padded.encode()).decode()
+            direction, value, pk = raw.split('|')
+            value = parse_datetime(value)
+            pk = int(pk)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            return None
+        if direction not in (FORWARD, BACKWARD) or value is None:
+            return None
+        return direction, value, pk
+
+    def _get_page(self, *args, **kwargs):
+        page = super()._get_page(*args, **kwargs)
+        # курсоры нужны и страницам, открытым по старым ссылкам ?page=N
+        if len(page):
+            page.next_cursor = self.encode(FORWARD, page[-1])
+            page.previous_cursor = self.encode(BACKWARD, page[0])
+        else:
+            page.next_cursor = page.previous_cursor = ''
+        return page
+
+    def _cursor_page(self, items, has_next, has_previous):
+        # тип страницы остаётся обычным Page: номера у неё нет, а
+        # наличие соседних страниц известно из выборки на одну запись
+        # больше, а не из COUNT(*)
+        page = self._get_page(items, None, self)
+        page.has_next = lambda: has_next
+        page.has_previous = lambda: has_previous
+        return page
+
+    def _parse(self, cursor):
+        if cursor == LAST:
+            return LAST, None, None
+        decoded = self.decode(cursor) if cursor else None
+        return decoded or (None, None, None)
+
+    def page_queryset(self, cursor=None):
+        """Запрос страницы за курсором: на одну запись больше per_page."""
+        direction, value, pk = self._parse(cursor)
+        if direction is None:
+            queryset = self.object_list
+        elif direction == LAST:
+            queryset = self.object_list.order_by(*self._ordering(True))
+        else:
+            reverse = direction == BACKWARD
+            queryset = (
+                self.object_list
+                .filter(self._after(value, pk, reverse))
+                .order_by(*self._ordering(reverse))
+            )
+        return queryset[:self.per_page + 1]
+
+    def get_cursor_page(self, cursor=None):
+        """Возвращает страницу, следующую за курсором.
+
+        Без курсора (или с битым курсором) отдаётся первая страница.
+        """
+        direction = self._parse(cursor)[0]
+        items = list(self.page_queryset(cursor))
+        has_more = len(items) > self.per_page
+        items = items[:self.per_page]
+        if direction is None:
+            return self._cursor_page(items, has_next=has_more,
+                                     has_previous=False)
+        if direction == FORWARD:
+            return self._cursor_page(items, has_next=has_more,
+                                     has_previous=True)
+        items.reverse()
+        if direction == BACKWARD:
+            return self._cursor_page(items, has_next=True,
+                                     has_previous=has_more)
+        return self._cursor_page(items, has_next=False,
+                                 has_previous=has_more)
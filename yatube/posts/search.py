@@ -0,0 +1,173 @@
+"""Полнотекстовый поиск по постам и комментариям.
+
+Индекс — виртуальная таблица SQLite FTS5 posts_search. В неё кладётся
+уже нормализованный текст: слова приводятся к основе стеммером
+Портера для русского языка, и тем же стеммером обрабатывается запрос.
+Строки постов и комментариев различаются по rowid: 2 * id для поста
+и 2 * id + 1 для комментария.
+"""
+import re
+
+from django.db import connection
+
+from yatube.settings import SEARCH_MAX_RESULTS
+
+from .models import Comment, Post
+
+TABLE = 'posts_search'
+
+# совпадение в комментарии весит меньше, чем в тексте поста
+COMMENT_WEIGHT = 0.5
+
+WORD = re.compile(r'\w+')
+
+PERFECTIVE_GERUND = re.compile(
+    r'((ив|ивши|ившись|ыв|ывши|ывшись)|((?<=[ая])(в|вши|вшись)))$')
+REFLEXIVE = re.compile(r'(с[яь])$')
+ADJECTIVE = re.compile(
+    r'(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых|'
+    r'ую|юю|ая|яя|ою|ею)$')
+PARTICIPLE = re.compile(r'((ивш|ывш|ующ)|((?<=[ая])(ем|нн|вш|ющ|щ)))$')
+VERB = re.compile(
+    r'((ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло|'
+    r'ено|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю)|((?<=[ая])(ла|на|ете|'
+    r'йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)))$')
+NOUN = re.compile(
+    r'(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем|'
+    r'ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$')
+RV = re.compile(r'^(.*?[аеиоуыэюя])(.*)$')
+DERIVATIONAL = re.compile(r'.*[^аеиоуыэюя]+[аеиоуыэюя].*ость?$')
+DERIVATIONAL_SUFFIX = re.compile(r'ость?$')
+SUPERLATIVE = re.compile(r'(ейше|ейш)$')
+
+
+def stem(word):
+    """Основа слова по алгоритму Портера для русского языка."""
+    word = word.lower().replace('ё', 'е')
+    match = RV.match(word)
+    if not match:
+        return word
+    start, rv = match.groups()
+    without_gerund = PERFECTIVE_GERUND.sub('', rv, 1)
+    if without_gerund != rv:
+        rv = without_gerund
+    else:
+        rv = REFLEXIVE.sub('', rv, 1)
+        without_adjective = ADJECTIVE.sub('', rv, 1)
+        if without_adjective != rv:
+            rv = PARTICIPLE.sub('', without_adjective, 1)
+        else:
+            without_verb = VERB.sub('', rv, 1)
+            rv = (NOUN.sub('', rv, 1) if without_verb == rv
+                  else without_verb)
+    rv = re.sub(r'и$', '', rv, 1)
+    if DERIVATIONAL.match(rv):
+        rv = DERIVATIONAL_SUFFIX.sub('', rv, 1)
+    without_soft_sign = re.sub(r'ь$', '', rv, 1)
+    if without_soft_sign != rv:
+        rv = without_soft_sign
+    else:
+        rv = SUPERLATIVE.sub('', rv, 1)
+        rv = re.sub(r'нн$', 'н', rv, 1)
+    return start + rv
+
+
+def normalize(text):
+    return ' '.join(stem(word) for word in WORD.findall(text))
+
+
+def available():
+    return connection.vendor == 'sqlite'
+
+
+def _replace(rowid, post_id, text):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [rowid])
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, body, post_id) '
+            'VALUES (%s, %s, %s)',
+            [rowid, normalize(text), post_id])
+
+
+def _delete(rowid):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [rowid])
+
+
+def index_post(post):
+    if available():
+        _replace(2 * post.pk, post.pk, post.text)
+
+
+def remove_post(post_id):
+    if available():
+        _delete(2 * post_id)
+
+
+def index_comment(comment):
+    if available():
+        _replace(2 * comment.pk + 1, comment.post_id, comment.text)
+
+
+def remove_comment(comment_id):
+    if available():
+        _delete(2 * comment_id + 1)
+
+
+def _match_expression(query):
+    terms = [stem(word) for word in WORD.findall(query)]
+    return ' '.join(f'"{term}"*' for term in terms if term)
+
+
+def search(query, limit=SEARCH_MAX_RESULTS):
+    """Список id постов по убыванию релевантности."""
+    if not available():
+        return list(
+            Post.objects.filter(text__icontains=query)
+            .values_list('pk', flat=True)[:limit])
+    expression = _match_expression(query)
+    if not expression:
+        return []
+    with connection.cursor() as cursor:
+        # bm25() нельзя звать внутри агрегата; LIMIT -1 не даёт SQLite
+        # развернуть подзапрос в агрегат, в отличие от MATERIALIZED
+        # работает и до 3.35
+        cursor.execute(
+            'SELECT post_id, MIN(score) AS rank FROM ('
+            f'SELECT post_id, CASE rowid %% 2 '
+            f'WHEN 1 THEN bm25({TABLE}) * {COMMENT_WEIGHT} '
+            f'ELSE bm25({TABLE}) END AS score '
+            f'FROM {TABLE} WHERE {TABLE} MATCH %s LIMIT -1'
+            ') GROUP BY post_id ORDER BY rank LIMIT %s',
+            [expression, limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _bulk_insert(rows):
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {TABLE} (rowid, body, post_id) '
+            'VALUES (%s, %s, %s)', rows)
+
+
+def rebuild(chunk_size=1000):
+    """Пересобирает индекс, читая таблицы потоково пачками."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+    total = 0
+    sources = (
+        (Post.objects.values_list('pk', 'pk', 'text'), 0),
+        (Comment.objects.values_list('pk', 'post_id', 'text'), 1),
+    )
+    for queryset, shift in sources:
+        rows = []
+        for pk, post_id, text in queryset.order_by().iterator(
+                chunk_size=chunk_size):
+            rows.append((2 * pk + shift, normalize(text), post_id))
+            if len(rows) >= chunk_size:
+                _bulk_insert(rows)
+                total += len(rows)
+                rows = []
+        _bulk_insert(rows)
+        total += len(rows)
+    return total
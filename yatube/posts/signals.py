@@ -0,0 +1,118 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import (cards, counters, follows, notifications, page_cache, search,
+               thumbnails, timelines)
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# поля, которые видны в карточке поста
+CARD_USER_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+def _bump_follow_pages(follow):
+    page_cache.bump(
+        page_cache.follow_scope(follow.user_id),
+        page_cache.profile_scope(follow.author.username),
+    )
+
+
+@receiver(pre_save, sender=Post)
+def post_group_changing(sender, instance, **kwargs):
+    instance._old_group_id = instance._old_image = None
+    if instance.pk:
+        cards.invalidate(instance)
+        instance._old_group_id, instance._old_image = (
+            Post.objects.filter(pk=instance.pk)
+            .values_list('group_id', 'image').first() or (None, None)
+        )
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.change(counters.AUTHOR_POSTS, instance.author_id, 1)
+        counters.change(counters.GROUP_POSTS, instance.group_id, 1)
+        timelines.push_post(instance)
+        notifications.notify_followers(instance)
+    elif instance._old_group_id != instance.group_id:
+        counters.change(counters.GROUP_POSTS, instance._old_group_id, -1)
+        counters.change(counters.GROUP_POSTS, instance.group_id, 1)
+    page_cache.bump_post(instance, instance.group_id, instance._old_group_id)
+    if not created:
+        timelines.bump_follow_pages(instance.author_id)
+    if instance.image and instance.image.name != instance._old_image:
+        thumbnails.schedule(instance)
+    search.index_post(instance)
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleting(sender, instance, **kwargs):
+    notifications.post_deleting(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.change(counters.AUTHOR_POSTS, instance.author_id, -1)
+    counters.change(counters.GROUP_POSTS, instance.group_id, -1)
+    counters.forget(counters.POST_COMMENTS, instance.pk)
+    search.remove_post(instance.pk)
+    page_cache.bump_post(instance, instance.group_id)
+    timelines.bump_follow_pages(instance.author_id)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.change(counters.POST_COMMENTS, instance.post_id, 1)
+    search.index_comment(instance)
+    page_cache.bump(page_cache.post_scope(instance.post_id))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.change(counters.POST_COMMENTS, instance.post_id, -1)
+    search.remove_comment(instance.pk)
+    page_cache.bump(page_cache.post_scope(instance.post_id))
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.change(counters.FOLLOWERS, instance.author_id, 1)
+        counters.change(counters.FOLLOWING, instance.user_id, 1)
+        timelines.backfill(instance.user_id, instance.author_id)
+    follows.forget(instance.user_id)
+    _bump_follow_pages(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.change(counters.FOLLOWERS, instance.author_id, -1)
+    counters.change(counters.FOLLOWING, instance.user_id, -1)
+    timelines.prune(instance.user_id, instance.author_id)
+    follows.forget(instance.user_id)
+    _bump_follow_pages(instance)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields, **kwargs):
+    if created or (update_fields and not CARD_USER_FIELDS & update_fields):
+        return
+    page_cache.bump(cards.author_scope(instance.pk),
+                    page_cache.profile_scope(instance.username))
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    if not created:
+        page_cache.bump(cards.group_scope(instance.pk),
+                        page_cache.group_scope(instance.slug))
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    counters.forget(counters.GROUP_POSTS, instance.pk)
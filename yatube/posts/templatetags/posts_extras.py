@@ -0,0 +1,40 @@
+from django import template
+
+from posts import cards, follows, thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def post_card(context, post):
+    """Карточка поста из кэша фрагментов.
+
+    При первом вызове на странице карточки всех постов page_obj
+    достаются из кэша за один запрос.
+    """
+    rendered = context.render_context.get('post_cards')
+    if rendered is None or post.pk not in rendered:
+        page = context.get('page_obj')
+        posts = list(page) if page is not None else [post]
+        if post not in posts:
+            posts.append(post)
+        rendered = cards.render_cards(posts, context.get('group'))
+        context.render_context['post_cards'] = rendered
+    return rendered[post.pk]
+
+
+@register.filter
+def followed_by(author_id, user):
+    """{% if post.author_id|followed_by:user %}: подписан ли user.
+
+    Подписки читаются из кэша один раз за запрос, поэтому фильтр можно
+    вызывать для каждого поста ленты. В кэшируемую карточку
+    posts_card.html его не ставить: она общая для всех.
+    """
+    return follows.is_following(user, author_id)
+
+
+@register.inclusion_tag('includes/picture.html')
+def picture(image, alias, sizes=None):
+    """<picture> с адаптивными вариантами миниатюры и запасной <img>."""
+    return thumbnails.picture(image, alias, sizes)
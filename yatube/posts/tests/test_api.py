@@ -0,0 +1,126 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from yatube.settings import MAX_POSTS
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for i in range(MAX_POSTS + 3):
+            Post.objects.create(author=cls.author, text=f'Пост {i}',
+                                group=cls.group)
+        cls.post = Post.objects.latest('pk')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_feeds(self):
+        """Ленты отдают компактный JSON и листаются курсором"""
+        urls = (
+            reverse('posts:api_index'),
+            reverse('posts:api_group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:api_profile', kwargs={'username': 'author'}),
+            reverse('posts:api_follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                data = self.reader_client.get(url).json()
+                self.assertEqual(len(data['results']), MAX_POSTS)
+                self.assertEqual(data['results'][0], {
+                    'id': self.post.pk,
+                    'text': self.post.text,
+                    'pub_date': self.post.pub_date.isoformat(),
+                    'author': 'author',
+                    'group': 'test-slug',
+                    'image': None,
+                })
+                self.assertIsNone(data['previous'])
+                rest = self.reader_client.get(
+                    url, {'cursor': data['next']}).json()
+                self.assertEqual(len(rest['results']), 3)
+                self.assertIsNone(rest['next'])
+
+    def test_follow_requires_login(self):
+        """Лента подписок без входа отвечает 401"""
+        response = self.guest_client.get(reverse('posts:api_follow_index'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_not_modified(self):
+        """Неизменившаяся лента отвечает 304 по ETag и Last-Modified"""
+        url = reverse('posts:api_index')
+        response = self.guest_client.get(url)
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('"'))
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes(self):
+        """Новый пост и правка старого меняют ETag ленты"""
+        url = reverse('posts:api_profile', kwargs={'username': 'author'})
+        etags = [self.guest_client.get(url)['ETag']]
+        post = Post.objects.earliest('pk')
+        post.text = 'Исправленный пост'
+        post.save()
+        etags.append(self.guest_client.get(url)['ETag'])
+        Post.objects.create(author=self.author, text='Новый пост')
+        etags.append(self.guest_client.get(url)['ETag'])
+        self.assertEqual(len(set(etags)), 3)
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etags[0])
+        self.assertEqual(response.status_code, 200)
+
+    def test_post_detail_validators_follow_author_posts(self):
+        """Новый пост автора меняет ETag поста с числом его постов"""
+        url = reverse('posts:api_post_detail',
+                      kwargs={'post_id': self.post.pk})
+        response = self.guest_client.get(url)
+        author_posts = response.json()['author_posts']
+        etag = response['ETag']
+        self.assertEqual(self.guest_client.get(
+            url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Post.objects.create(author=self.author, text='Новый пост')
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['author_posts'], author_posts + 1)
+
+    def test_post_detail(self):
+        """Пост отдаётся с первой страницей комментариев"""
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text='Комментарий')
+        url = reverse('posts:api_post_detail',
+                      kwargs={'post_id': self.post.pk})
+        response = self.guest_client.get(url)
+        data = response.json()
+        self.assertEqual(data['author_posts'], MAX_POSTS + 3)
+        self.assertEqual(data['comments_count'], 1)
+        self.assertEqual(data['comments'][0]['author'], 'reader')
+        self.assertIsNone(data['comments_next'])
+        response = self.guest_client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text='Ещё комментарий')
+        response = self.guest_client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,79 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from .. import counters
+from ..management.commands.benchmark import WRITE_ROUTES
+from ..models import Comment, Follow, Group, Post, TimelineEntry
+from ..urls import urlpatterns
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class BenchmarkTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def seed(self):
+        call_command('seed_data', users=5, groups=2, posts=40, comments=30,
+                     follows=8, images=0.5, seed=1, stdout=StringIO())
+
+    def test_seed_data(self):
+        """Сид создаёт данные пачками и собирает производные таблицы"""
+        self.seed()
+        self.assertEqual(User.objects.count(), 5)
+        self.assertEqual(Group.objects.count(), 2)
+        self.assertEqual(Post.objects.count(), 40)
+        self.assertEqual(Comment.objects.count(), 30)
+        self.assertTrue(Post.objects.exclude(image='').exists())
+        follow = Follow.objects.first()
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=follow.user).count(),
+            Post.objects.filter(author__following__user=follow.user).count())
+        author = Post.objects.first().author
+        self.assertEqual(counters.get(counters.AUTHOR_POSTS, author.pk),
+                         author.posts.count())
+
+    def test_benchmark(self):
+        """Бенчмарк проходит адреса posts, кроме пишущих, и пишет JSON"""
+        self.seed()
+        comments = Comment.objects.count()
+        path = os.path.join(TEMP_MEDIA_ROOT, 'run.json')
+        call_command('benchmark', requests=2, warmup=0, output=path,
+                     stdout=StringIO())
+        with open(path) as file:
+            results = json.load(file)['results']
+        self.assertEqual(set(results),
+                         {pattern.name for pattern in urlpatterns}
+                         - WRITE_ROUTES)
+        for result in results.values():
+            self.assertEqual(result['requests'], 2)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+            self.assertIn('queries_mean', result)
+        self.assertEqual(Comment.objects.count(), comments)
+        out = StringIO()
+        call_command('benchmark', requests=1, warmup=0, output=path + '.2',
+                     compare=path, stdout=out)
+        self.assertIn('Сравнение', out.getvalue())
+
+    def test_session_queries_leave_data(self):
+        """Замер запросов по хранилищам сессий не меняет подписок"""
+        self.seed()
+        follows = set(Follow.objects.values_list('user', 'author'))
+        out = StringIO()
+        call_command('session_queries', requests=1, stdout=out)
+        self.assertNotIn('profile_follow', out.getvalue())
+        self.assertIn('signed_cookies', out.getvalue())
+        self.assertEqual(
+            set(Follow.objects.values_list('user', 'author')), follows)
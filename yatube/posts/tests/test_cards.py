@@ -0,0 +1,54 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+
+from .. import cards
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class PostCardsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cards_cached(self):
+        """Повторный рендер карточки берётся из кэша без запросов"""
+        post = Post.objects.select_related('author', 'group').get(
+            pk=self.post.pk)
+        first = cards.render_cards([post])
+        with self.assertNumQueries(0):
+            second = cards.render_cards([post])
+        self.assertEqual(first, second)
+
+    def test_edit_invalidates_card(self):
+        """После правки поста карточка рендерится заново"""
+        post = Post.objects.get(pk=self.post.pk)
+        cards.render_cards([post])
+        post.text = 'Исправленный пост'
+        post.save()
+        html = cards.render_cards([post])[post.pk]
+        self.assertIn('Исправленный пост', html)
+
+    def test_author_and_group_change_card(self):
+        """Переименование автора или группы даёт новую карточку"""
+        group = Group.objects.create(title='Группа', slug='group',
+                                     description='Описание')
+        post = Post.objects.create(author=self.user, group=group,
+                                   text='Пост в группе')
+        cards.render_cards([post])
+        self.user.first_name = 'Лев'
+        self.user.last_name = 'Толстой'
+        self.user.save()
+        group.slug = 'renamed'
+        group.save()
+        post = Post.objects.select_related('author', 'group').get(pk=post.pk)
+        html = cards.render_cards([post])[post.pk]
+        self.assertIn('Лев Толстой', html)
+        self.assertIn('/group/renamed/', html)
@@ -1,6 +1,10 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import Client, TestCase
 from django.urls import reverse
+
+from yatube.settings import COMMENTS_PER_PAGE
+
 from ..models import Group, Post, Comment
 
 User = get_user_model()
@@ -25,6 +29,7 @@ class CommentTest(TestCase):
         )
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client.force_login(CommentTest.user)
@@ -54,3 +59,60 @@ class CommentTest(TestCase):
         self.assertEqual(Comment.objects.count(), 1)
         self.assertEqual(comment.text, data_context['text'])
         self.assertEqual(response.status_code, 200)
+
+    def test_post_detail_query_budget(self):
+        """Число запросов post_detail не зависит от числа комментариев"""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        for count in (1, 20):
+            commenters = [
+                User.objects.create_user(username=f'commenter-{count}-{i}')
+                for i in range(count)
+            ]
+            Comment.objects.bulk_create(
+                Comment(post=self.post, author=author, text='Комментарий')
+                for author in commenters
+            )
+            # валидаторы условного GET, пост с автором и группой,
+            # счётчик постов, комментарии
+            with self.assertNumQueries(4):
+                self.guest_client.get(url)
+            # плюс сессия и пользователь
+            with self.assertNumQueries(6):
+                self.authorized_client.get(url)
+
+    def test_comments_pages(self):
+        """Комментарии отдаются страницами, следующие — отдельным адресом"""
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.user, text=f'Коммент {i}')
+            for i in range(COMMENTS_PER_PAGE + 5)
+        )
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}))
+        first = response.context['comments']
+        self.assertEqual(len(first), COMMENTS_PER_PAGE)
+        self.assertEqual(first[0].text, 'Коммент 0')
+        self.assertTrue(first.has_next())
+        url = reverse('posts:post_comments', kwargs={'post_id': self.post.id})
+        response = self.guest_client.get(url, {'cursor': first.next_cursor})
+        self.assertEqual(len(response.context['comments']), 5)
+        self.assertNotContains(response, 'Показать ещё')
+        data = self.guest_client.get(
+            url, {'cursor': first.next_cursor, 'format': 'json'}).json()
+        rest = range(COMMENTS_PER_PAGE, COMMENTS_PER_PAGE + 5)
+        self.assertEqual([comment['text'] for comment in data['comments']],
+                         [f'Коммент {i}' for i in rest])
+        self.assertEqual(data['next_cursor'], '')
+
+    def test_comments_page_cache(self):
+        """Кэш страницы комментариев сбрасывается новым комментарием"""
+        url = reverse('posts:post_comments', kwargs={'post_id': self.post.id})
+        self.assertEqual(
+            self.guest_client.get(url, {'format': 'json'}).json()['comments'],
+            [])
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.id}),
+            {'text': 'Новый комментарий'})
+        comments = self.guest_client.get(
+            url, {'format': 'json'}).json()['comments']
+        self.assertEqual([comment['text'] for comment in comments],
+                         ['Новый комментарий'])
@@ -0,0 +1,104 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import page_cache
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(author=cls.author, text='Пост',
+                                       group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_not_modified_without_render(self):
+        """Неизменившаяся страница отвечает 304 без шаблонов"""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertIn('no-cache', response['Cache-Control'])
+                etag = response['ETag']
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.templates, [])
+                response = self.guest_client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+                self.assertEqual(response.status_code, 304)
+
+    def test_changes_reset_validators(self):
+        """Новый пост в ленте и новый комментарий меняют ETag"""
+        profile = reverse('posts:profile', kwargs={'username': 'author'})
+        detail = reverse('posts:post_detail',
+                         kwargs={'post_id': self.post.pk})
+        etags = {url: self.guest_client.get(url)['ETag']
+                 for url in (profile, detail)}
+        Post.objects.create(author=self.author, text='Новый пост')
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text='Комментарий')
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_deleting_older_post_resets_last_modified(self):
+        """Удаление не самого нового поста сбрасывает If-Modified-Since"""
+        old = Post.objects.create(author=self.author, text='Старый пост')
+        Post.objects.filter(pk=old.pk).update(
+            updated=self.post.updated.replace(year=2000))
+        url = reverse('posts:index')
+        last_modified = self.guest_client.get(url)['Last-Modified']
+        old.delete()
+        # поколение сброшено на секунду позже прежнего Last-Modified
+        later = page_cache._new_generation() + 10 ** 6
+        with mock.patch.object(page_cache, '_new_generation',
+                               return_value=later):
+            response = self.guest_client.get(
+                url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+
+    def test_index_validators_without_queries(self):
+        """Валидаторы главной не читают таблицу постов"""
+        etag = self.guest_client.get(reverse('posts:index'))['ETag']
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(
+                reverse('posts:index'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_user_specific(self):
+        """Страница пользователя не совпадает с анонимной"""
+        url = reverse('posts:index')
+        etag = self.guest_client.get(url)['ETag']
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Last-Modified'))
+        response = self.reader_client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
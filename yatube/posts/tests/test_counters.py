@@ -0,0 +1,76 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from .. import counters
+from ..models import Comment, Counter, Follow, Group, Post
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, text='Тестовый пост', group=cls.group)
+
+    def test_post_counters(self):
+        """Счётчики постов автора и группы следуют за созданием/удалением"""
+        post = Post.objects.create(
+            author=self.author, text='Ещё пост', group=self.group)
+        self.assertEqual(counters.get(counters.AUTHOR_POSTS,
+                                      self.author.pk), 2)
+        self.assertEqual(counters.get(counters.GROUP_POSTS,
+                                      self.group.pk), 2)
+        post.group = None
+        post.save()
+        self.assertEqual(counters.get(counters.GROUP_POSTS,
+                                      self.group.pk), 1)
+        post.delete()
+        self.assertEqual(counters.get(counters.AUTHOR_POSTS,
+                                      self.author.pk), 1)
+
+    def test_group_delete_forgets_counter(self):
+        """Удаление группы удаляет и её счётчик постов"""
+        group = Group.objects.create(title='Группа', slug='group',
+                                     description='Описание')
+        Post.objects.create(author=self.author, text='Пост', group=group)
+        group_id = group.pk
+        self.assertTrue(Counter.objects.filter(
+            kind=counters.GROUP_POSTS, object_id=group_id).exists())
+        group.delete()
+        self.assertFalse(Counter.objects.filter(
+            kind=counters.GROUP_POSTS, object_id=group_id).exists())
+
+    def test_comment_and_follow_counters(self):
+        """Счётчики комментариев и подписок"""
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(counters.get(counters.POST_COMMENTS,
+                                      self.post.pk), 1)
+        self.assertEqual(counters.get(counters.FOLLOWERS,
+                                      self.author.pk), 1)
+        self.assertEqual(counters.get(counters.FOLLOWING,
+                                      self.reader.pk), 1)
+        Follow.objects.all().delete()
+        self.assertEqual(counters.get(counters.FOLLOWERS,
+                                      self.author.pk), 0)
+
+    def test_reconcile_command(self):
+        """reconcile_counters чинит разъехавшиеся счётчики"""
+        counters.get(counters.AUTHOR_POSTS, self.author.pk)
+        Counter.objects.update(value=42)
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertEqual(counters.get(counters.AUTHOR_POSTS,
+                                      self.author.pk), 1)
@@ -0,0 +1,51 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from .. import feeds
+from ..management.commands.explain_feeds import problems
+from ..models import Follow, Post
+from ..paginators import CursorPaginator
+
+User = get_user_model()
+
+
+class FeedsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Post.objects.bulk_create(
+            Post(author=cls.author, text=f'Пост {i}') for i in range(5))
+
+    def test_feed_plans_use_indexes(self):
+        """Все ленты читаются по индексам, без сортировок в памяти"""
+        out = StringIO()
+        call_command('explain_feeds', stdout=out)
+        self.assertIn('follow_index (next)', out.getvalue())
+
+    def test_problems(self):
+        """Полный проход и временное B-дерево отмечаются как проблемы"""
+        plan = ('2 0 0 SCAN posts_post\n'
+                '3 0 0 SCAN posts_post USING INDEX post_pub_date_idx\n'
+                '4 0 0 USE TEMP B-TREE FOR ORDER BY')
+        self.assertEqual(problems(plan), [
+            '2 0 0 SCAN posts_post',
+            '4 0 0 USE TEMP B-TREE FOR ORDER BY',
+        ])
+
+    def test_follow_feed_pages(self):
+        """Лента подписок листается курсорами по колонкам timelineentry"""
+        call_command('rebuild_timelines', stdout=StringIO())
+        paginator = CursorPaginator(
+            feeds.follow_posts(self.reader), 2, **feeds.FOLLOW_ORDER)
+        first = paginator.get_cursor_page()
+        second = paginator.get_cursor_page(first.next_cursor)
+        third = paginator.get_cursor_page(second.next_cursor)
+        expected = list(self.author.posts.order_by('-pub_date', '-pk'))
+        self.assertEqual(list(first) + list(second) + list(third), expected)
+        self.assertFalse(third.has_next())
@@ -0,0 +1,78 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import follows
+from ..models import Follow
+
+User = get_user_model()
+
+
+class FollowStateTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.fan = User.objects.create_user(username='fan')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.fan, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def profile(self, client):
+        return client.get(
+            reverse('posts:profile', kwargs={'username': 'author'}))
+
+    def test_profile_shows_own_follow_state(self):
+        """Кнопка зависит от подписки текущего пользователя, не чужой"""
+        follow_url = reverse('posts:profile_follow',
+                             kwargs={'username': 'author'})
+        unfollow_url = reverse('posts:profile_unfollow',
+                               kwargs={'username': 'author'})
+        response = self.profile(self.reader_client)
+        self.assertFalse(response.context['following'])
+        self.assertContains(response, follow_url)
+        self.assertNotContains(response, unfollow_url)
+        # подписка меняет кнопку, хотя ETag постов тот же
+        etag = response['ETag']
+        self.reader_client.get(follow_url)
+        response = self.profile(self.reader_client)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertTrue(response.context['following'])
+        self.assertContains(response, unfollow_url)
+        self.reader_client.get(unfollow_url)
+        self.assertFalse(self.profile(self.reader_client).context['following'])
+        # на своей странице кнопки нет
+        author_client = Client()
+        author_client.force_login(self.author)
+        self.assertNotContains(self.profile(author_client), follow_url)
+
+    def test_following_ids_cached_and_invalidated(self):
+        """Подписки читаются из кэша, сигналы Follow их сбрасывают"""
+        self.assertEqual(follows.following_ids(self.fan.pk),
+                         {self.author.pk})
+        with self.assertNumQueries(0):
+            follows.following_ids(self.fan.pk)
+        Follow.objects.create(user=self.fan, author=self.reader)
+        self.assertEqual(follows.following_ids(self.fan.pk),
+                         {self.author.pk, self.reader.pk})
+        Follow.objects.filter(user=self.fan).delete()
+        self.assertEqual(follows.following_ids(self.fan.pk), frozenset())
+
+    def test_followed_by_filter(self):
+        """Фильтр проверяет много авторов за одно чтение подписок"""
+        template = Template(
+            '{% load posts_extras %}{% for id in ids %}'
+            '{% if id|followed_by:user %}+{% else %}-{% endif %}'
+            '{% endfor %}')
+        ids = [self.author.pk, self.reader.pk] * 10
+        fan = User.objects.get(pk=self.fan.pk)
+        follows.following_ids(fan.pk)
+        with self.assertNumQueries(0):
+            rendered = template.render(Context({'ids': ids, 'user': fan}))
+        self.assertEqual(rendered, '+-' * 10)
@@ -0,0 +1,111 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.models import Job
+
+from .. import counters, notifications
+from ..models import Follow, Notification, Post
+
+User = get_user_model()
+
+
+class NotificationsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.readers = [User.objects.create_user(username=f'reader{i}')
+                       for i in range(3)]
+        for reader in cls.readers:
+            Follow.objects.create(user=reader, author=cls.author)
+        cls.reader = cls.readers[0]
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def unread(self):
+        response = self.reader_client.get(
+            reverse('posts:api_notifications_unread'))
+        return response.json()['unread']
+
+    def test_new_post_notifies_followers(self):
+        """Новый пост даёт уведомление каждому подписчику"""
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertEqual(
+            set(Notification.objects.filter(post=post)
+                .values_list('user', flat=True)),
+            {reader.pk for reader in self.readers})
+        self.assertFalse(Notification.objects.filter(user=self.author))
+        self.assertEqual(self.unread(), 1)
+
+    def test_large_fan_out_is_batched_job(self):
+        """Большая рассылка идёт задачей очереди пачками и без дублей"""
+        with mock.patch.object(notifications, 'NOTIFICATION_SYNC_FANOUT', 0):
+            post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertFalse(Notification.objects.exists())
+        self.assertTrue(Job.objects.filter(
+            key=f'notify_followers:{post.pk}').exists())
+        with mock.patch.object(notifications, 'NOTIFICATION_BATCH_SIZE', 2):
+            call_command('run_jobs', once=True, stdout=StringIO())
+            # повтор задачи не задваивает уведомления и счётчики
+            notifications.fan_out(post.pk)
+        self.assertEqual(Notification.objects.count(), len(self.readers))
+        for reader in self.readers:
+            self.assertEqual(
+                counters.get(counters.UNREAD_NOTIFICATIONS, reader.pk), 1)
+
+    def test_unread_count_is_cached(self):
+        """Число непрочитанных читается из кэша без запросов к базе"""
+        Post.objects.create(author=self.author, text='Новый пост')
+        self.assertEqual(self.unread(), 1)
+        with self.assertNumQueries(2):
+            # сессия и пользователь
+            self.assertEqual(self.unread(), 1)
+        Post.objects.create(author=self.author, text='Ещё пост')
+        self.assertEqual(self.unread(), 2)
+
+    def test_list_read_and_clear(self):
+        """Уведомления листаются, читаются и очищаются через API"""
+        posts = [Post.objects.create(author=self.author, text=f'Пост {i}')
+                 for i in range(3)]
+        response = self.reader_client.get(
+            reverse('posts:api_notifications'))
+        data = response.json()
+        self.assertEqual([item['post'] for item in data['results']],
+                         [post.pk for post in reversed(posts)])
+        self.assertEqual(data['unread'], 3)
+        first = data['results'][0]['id']
+        response = self.reader_client.post(
+            reverse('posts:api_notifications_read'), {'id': [first]})
+        self.assertEqual(response.json(), {'read': 1, 'unread': 2})
+        response = self.reader_client.post(
+            reverse('posts:api_notifications_read'))
+        self.assertEqual(response.json(), {'read': 2, 'unread': 0})
+        posts[0].delete()
+        response = self.reader_client.post(
+            reverse('posts:api_notifications_clear'))
+        self.assertEqual(response.json(), {'deleted': 2, 'unread': 0})
+        self.assertEqual(self.unread(), 0)
+        self.assertEqual(
+            self.reader_client.get(
+                reverse('posts:api_notifications_clear')).status_code, 405)
+        self.assertEqual(
+            Client().get(reverse('posts:api_notifications')).status_code,
+            401)
+
+    def test_deleted_post_drops_unread(self):
+        """Удаление поста списывает его непрочитанные уведомления"""
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertEqual(self.unread(), 1)
+        post.delete()
+        self.assertEqual(self.unread(), 0)
+        self.assertEqual(
+            counters.reconcile(counters.UNREAD_NOTIFICATIONS), 0)
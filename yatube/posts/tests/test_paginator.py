@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import Client, TestCase
 from django.urls import reverse
 
@@ -36,6 +37,7 @@ class PaginatorViewsTest(TestCase):
 
     def setUp(self):
         self.guest_client = Client()
+        cache.clear()
 
     def test_paginaror_pages_first(self):
         """Пагинатор отрбражает 10/13 постов на странице"""
@@ -53,3 +55,27 @@ class PaginatorViewsTest(TestCase):
                 response = self.guest_client.get(page)
                 self.assertEqual(len(response.context['page_obj']),
                                  POSTS_ON_PAGES_SECOND)
+
+    def test_paginator_cursor_pages(self):
+        """Курсор ведёт на следующую и обратно на первую страницу"""
+        for page in self.pages:
+            with self.subTest(page=page):
+                first = self.guest_client.get(page).context['page_obj']
+                second = self.guest_client.get(
+                    f'{page}?cursor={first.next_cursor}'
+                ).context['page_obj']
+                self.assertEqual(len(second), POSTS_ON_PAGES_SECOND)
+                self.assertFalse(second.has_next())
+                back = self.guest_client.get(
+                    f'{page}?cursor={second.previous_cursor}'
+                ).context['page_obj']
+                self.assertEqual([post.pk for post in back],
+                                 [post.pk for post in first])
+                self.assertFalse(back.has_previous())
+
+    def test_paginator_bad_cursor(self):
+        """Битый курсор отдаёт первую страницу"""
+        response = self.guest_client.get(
+            reverse('posts:index') + '?cursor=broken')
+        self.assertEqual(len(response.context['page_obj']),
+                         POSTS_ON_PAGES_FIRST)
@@ -0,0 +1,60 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import search
+from ..models import Comment, Post
+
+User = get_user_model()
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(
+            author=cls.user, text='Прогулка по осеннему лесу')
+        cls.other = Post.objects.create(
+            author=cls.user, text='Рецепт яблочного пирога')
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_stemming(self):
+        """Разные формы слова приводятся к одной основе"""
+        self.assertEqual(search.stem('лесу'), search.stem('лес'))
+        self.assertEqual(search.stem('пирогами'), search.stem('пирог'))
+
+    def test_search_finds_word_forms(self):
+        """Поиск находит пост по другой форме слова"""
+        self.assertEqual(search.search('леса'), [self.post.pk])
+        self.assertEqual(search.search('пироги'), [self.other.pk])
+
+    def test_search_comments(self):
+        """Совпадение в комментарии находит пост"""
+        Comment.objects.create(
+            post=self.other, author=self.user, text='Очень вкусные яблоки')
+        self.assertEqual(search.search('яблоки'), [self.other.pk])
+
+    def test_deleted_post_removed(self):
+        """Удалённый пост пропадает из индекса"""
+        Post.objects.filter(pk=self.post.pk).delete()
+        self.assertEqual(search.search('лес'), [])
+
+    def test_search_view(self):
+        """Страница поиска показывает найденные посты"""
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': 'осенний лес'})
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']],
+            [self.post.pk])
+
+    def test_rebuild_command(self):
+        """rebuild_search_index восстанавливает индекс"""
+        search.rebuild()
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(search.search('лесу'), [self.post.pk])
@@ -0,0 +1,131 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core import kvstore
+from core.kvstore import SQLiteStore
+from core.models import Job
+
+from .. import cards, thumbnails
+from ..models import Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF,
+                                     content_type='image/gif'),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        # у каждого теста своё пустое хранилище метаданных
+        self.store = SQLiteStore(
+            os.path.join(tempfile.mkdtemp(dir=TEMP_MEDIA_ROOT), 'kv.sqlite3'))
+        # и URL, и метаданные sorl-thumbnail
+        for module in (thumbnails, kvstore):
+            patcher = mock.patch.object(module, 'store',
+                                        return_value=self.store)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        thumbnails._memo.clear()
+        thumbnails._pending.clear()
+
+    def card(self):
+        return cards.render_cards([self.post])[self.post.pk]
+
+    def test_original_until_generated(self):
+        """Пока миниатюры нет, отдаётся исходная картинка"""
+        self.assertEqual(thumbnails.get_url(self.post.image, 'card'),
+                         self.post.image.url)
+
+    def test_process_post(self):
+        """После обработки шаблон получает URL миниатюры"""
+        thumbnails.process_post(self.post.pk)
+        url = thumbnails.get_url(self.post.image, 'card')
+        self.assertNotEqual(url, self.post.image.url)
+        self.assertTrue(url.startswith(settings.MEDIA_URL + 'cache/'))
+
+    def test_queued_job(self):
+        """Новая картинка ставит задачу, которую выполняет run_jobs"""
+        job = Job.objects.get(name='posts.thumbnails')
+        self.assertEqual(job.key,
+                         f'thumbnails:{self.post.pk}:{self.post.image.name}')
+        call_command('run_jobs', once=True, stdout=StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertNotEqual(thumbnails.get_url(self.post.image, 'card'),
+                            self.post.image.url)
+
+    def test_preload_and_stats(self):
+        """URL подгружаются пачкой, метрики считают попадания"""
+        thumbnails.process_post(self.post.pk)
+        thumbnails._memo.clear()
+        thumbnails.preload([self.post.image.name])
+        self.assertEqual(len(thumbnails._memo),
+                         len(thumbnails.url_keys(self.post.image.name)))
+        thumbnails.get_url(self.post.image, 'card')
+        stats = thumbnails.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['generated'], len(list(
+            thumbnails.variants('card'))))
+
+    def test_picture_srcset(self):
+        """Карточка получает <picture> со srcset всех ширин"""
+        html = self.card()
+        self.assertNotIn('srcset', html)
+        thumbnails.process_post(self.post.pk)
+        context = thumbnails.picture(self.post.image, 'card')
+        widths = thumbnails.widths('card')
+        self.assertEqual(widths, sorted(
+            {*settings.THUMBNAIL_WIDTHS, thumbnails.size('card')[0]}))
+        self.assertEqual(context['srcset'].count('w,'), len(widths) - 1)
+        self.assertEqual(len(context['sources']),
+                         len(thumbnails.FORMATS) - 1)
+        self.assertIn(context['src'], context['srcset'])
+        self.post.refresh_from_db()
+        cache.clear()
+        html = self.card()
+        self.assertIn('<picture>', html)
+        self.assertIn(f'sizes="{settings.THUMBNAIL_SIZES["card"]}"', html)
+
+    def test_image_savings(self):
+        """Отчёт сравнивает байты основной миниатюры и варианта"""
+        thumbnails.process_post(self.post.pk)
+        out = StringIO()
+        call_command('image_savings', viewport=100, dpr=1, stdout=out)
+        self.assertIn('Вариант для экрана: card@320', out.getvalue())
+        self.assertIn('Страница 1: было', out.getvalue())
+        self.assertNotIn('без миниатюр', out.getvalue())
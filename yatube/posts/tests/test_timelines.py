@@ -0,0 +1,93 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.models import Job
+
+from .. import timelines
+from ..models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.author, text='Старый пост')
+
+    def timeline(self):
+        return list(TimelineEntry.objects.filter(
+            user=self.reader).values_list('post_id', flat=True))
+
+    def test_follow_backfills_timeline(self):
+        """После подписки в ленту попадают старые посты автора"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.timeline(), [self.post.pk])
+
+    def test_new_post_fans_out(self):
+        """Новый пост раскладывается по лентам подписчиков"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertIn(post.pk, self.timeline())
+
+    def test_large_fan_out_is_queued(self):
+        """Рассылка большому числу подписчиков уходит в очередь задач"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        with mock.patch.object(timelines, 'TIMELINE_SYNC_FANOUT', 0):
+            post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertNotIn(post.pk, self.timeline())
+        self.assertTrue(Job.objects.filter(
+            name='posts.push_post', key=f'push_post:{post.pk}').exists())
+        call_command('run_jobs', once=True, stdout=StringIO())
+        self.assertIn(post.pk, self.timeline())
+
+    def test_queued_fan_out_resets_follow_page(self):
+        """Страница ленты, закэшированная до задачи, не теряет пост"""
+        cache.clear()
+        Follow.objects.create(user=self.reader, author=self.author)
+        client = Client()
+        client.force_login(self.reader)
+        with mock.patch.object(timelines, 'TIMELINE_SYNC_FANOUT', 0):
+            post = Post.objects.create(author=self.author, text='Новый пост')
+        url = reverse('posts:follow_index')
+        self.assertNotIn(post, client.get(url).context['page_obj'])
+        call_command('run_jobs', once=True, stdout=StringIO())
+        self.assertContains(client.get(url), 'Новый пост')
+
+    def test_large_edit_resets_follow_pages_in_job(self):
+        """Правка поста большого автора сбрасывает ленты задачей"""
+        cache.clear()
+        Follow.objects.create(user=self.reader, author=self.author)
+        client = Client()
+        client.force_login(self.reader)
+        url = reverse('posts:follow_index')
+        client.get(url)
+        with mock.patch.object(timelines, 'TIMELINE_SYNC_FANOUT', 0):
+            self.post.text = 'Исправленный пост'
+            self.post.save()
+        self.assertTrue(Job.objects.filter(
+            name='posts.bump_follow_pages').exists())
+        self.assertNotContains(client.get(url), 'Исправленный пост')
+        call_command('run_jobs', once=True, stdout=StringIO())
+        self.assertContains(client.get(url), 'Исправленный пост')
+
+    def test_unfollow_prunes_timeline(self):
+        """После отписки посты автора пропадают из ленты"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.filter(user=self.reader, author=self.author).delete()
+        self.assertEqual(self.timeline(), [])
+
+    def test_rebuild_command(self):
+        """Команда rebuild_timelines восстанавливает ленты"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(self.timeline(), [self.post.pk])
@@ -0,0 +1,94 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from .. import counters
+from ..models import Comment, Follow, Group, Post, TimelineEntry
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class TransferTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def snapshot(self):
+        return {
+            'groups': set(Group.objects.values_list('slug', 'title')),
+            'posts': set(Post.objects.values_list(
+                'id', 'text', 'pub_date', 'author__username',
+                'group__slug', 'image')),
+            'comments': set(Comment.objects.values_list(
+                'id', 'post_id', 'author__username', 'created')),
+            'follows': set(Follow.objects.values_list(
+                'user__username', 'author__username')),
+        }
+
+    def test_round_trip(self):
+        """Выгрузка и загрузка восстанавливают данные и картинки"""
+        call_command('seed_data', users=5, groups=2, posts=30, comments=20,
+                     follows=6, images=0.5, seed=2, stdout=StringIO())
+        before = self.snapshot()
+        images = {post.image.name for post in Post.objects.exclude(image='')}
+        for format in ('ndjson', 'csv'):
+            with self.subTest(format=format), \
+                    tempfile.TemporaryDirectory() as directory:
+                call_command('export_data', directory, format=format,
+                             chunk_size=7, stdout=StringIO())
+                Group.objects.all().delete()
+                User.objects.all().delete()
+                for name in images:
+                    default_storage.delete(name)
+                out = StringIO()
+                call_command('import_data', directory, batch_size=7,
+                             stdout=out)
+                self.assertIn('posts: готово 30 строк', out.getvalue())
+                self.assertEqual(self.snapshot(), before)
+                for name in images:
+                    self.assertTrue(default_storage.exists(name))
+                call_command('import_data', directory, stdout=StringIO())
+                self.assertEqual(self.snapshot(), before)
+        follow = Follow.objects.first()
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=follow.user).count(),
+            Post.objects.filter(author__following__user=follow.user).count())
+        author = Post.objects.first().author
+        self.assertEqual(counters.get(counters.AUTHOR_POSTS, author.pk),
+                         author.posts.count())
+        self.assertFalse(author.has_usable_password())
+        post = Post.objects.create(author=author, text='Новый пост')
+        self.assertGreater(post.pk, max(pk for pk, *_ in before['posts']))
+
+    def test_refuses_colliding_ids(self):
+        """Чужие записи с теми же id не перезаписываются и не
+        подмешиваются"""
+        call_command('seed_data', users=3, groups=1, posts=5, comments=5,
+                     follows=2, seed=3, stdout=StringIO())
+        with tempfile.TemporaryDirectory() as directory:
+            call_command('export_data', directory, stdout=StringIO())
+            post_ids = list(Post.objects.values_list('pk', flat=True))
+            Post.objects.all().delete()
+            local = User.objects.create_user(username='local')
+            Post.objects.create(id=post_ids[0], author=local,
+                                text='Местный пост')
+            with self.assertRaisesMessage(CommandError,
+                                          f'posts: id {post_ids[0]}'):
+                call_command('import_data', directory, stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 1)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_missing_export(self):
+        """Без файлов выгрузки команда падает с понятной ошибкой"""
+        with tempfile.TemporaryDirectory() as directory, \
+                self.assertRaisesMessage(CommandError, 'нет выгрузки'):
+            call_command('import_data', directory, stdout=StringIO())
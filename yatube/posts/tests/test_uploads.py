@@ -0,0 +1,128 @@
+import hashlib
+import io
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .. import uploads
+from ..models import Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def image_bytes(size=(300, 200), mode='RGB', format='JPEG', exif=None):
+    buffer = io.BytesIO()
+    image = Image.new(mode, size, 'red')
+    if exif is not None:
+        image.save(buffer, format, exif=exif)
+    else:
+        image.save(buffer, format)
+    return buffer.getvalue()
+
+
+def upload(content, name='photo.jpg'):
+    file = io.BytesIO(content)
+    file.name = name
+    return file
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class UploadTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def create(self, content, name='photo.jpg'):
+        return self.client.post(reverse('posts:post_create'), {
+            'text': 'Пост с картинкой', 'image': upload(content, name)})
+
+    def test_normalized_and_content_addressed(self):
+        """Картинка уменьшается, теряет EXIF и зовётся по хэшу"""
+        exif = Image.Exif()
+        # 0x010F — производитель камеры
+        exif[0x010F] = 'Camera'
+        content = image_bytes(exif=exif.tobytes())
+        with mock.patch.object(uploads, 'IMAGE_MAX_SIDE', 100):
+            self.create(content)
+        post = Post.objects.get()
+        sha256 = hashlib.sha256(content).hexdigest()
+        self.assertEqual(post.image.name,
+                         f'posts/{sha256[:2]}/{sha256}.jpg')
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (100, 67))
+            self.assertNotIn('exif', image.info)
+
+    def test_transparent_png(self):
+        """Прозрачная картинка остаётся PNG, непрозрачная становится JPEG"""
+        cases = (((255, 0, 0, 255), 'JPEG'), ((0, 0, 0, 0), 'PNG'))
+        for color, format in cases:
+            with self.subTest(format=format):
+                content = io.BytesIO()
+                Image.new('RGBA', (10, 10), color).save(content, 'PNG')
+                self.create(content.getvalue(), 'logo.png')
+                with Image.open(Post.objects.latest('pk').image.path) as image:
+                    self.assertEqual(image.format, format)
+
+    def test_duplicates_share_file(self):
+        """Одинаковые загрузки ссылаются на один файл"""
+        content = image_bytes()
+        self.create(content)
+        with mock.patch.object(uploads, 'normalize') as normalize:
+            self.create(content)
+        normalize.assert_not_called()
+        first, second = Post.objects.order_by('pk')
+        self.assertEqual(first.image.name, second.image.name)
+        directory = default_storage.path(first.image.name).rsplit('/', 1)[0]
+        self.assertEqual(len(default_storage.listdir(directory)[1]), 1)
+
+    def test_limits_checked_before_decode(self):
+        """Большой файл и картинка-бомба отклоняются без декодирования"""
+        cases = (
+            ('IMAGE_MAX_BYTES', 100, 'Файл больше'),
+            ('IMAGE_MAX_PIXELS', 1000, 'Слишком большая картинка'),
+        )
+        for setting, value, message in cases:
+            with self.subTest(setting=setting), \
+                    mock.patch.object(uploads, setting, value), \
+                    mock.patch.object(uploads, 'normalize') as normalize:
+                response = self.create(image_bytes())
+                error, = response.context['form'].errors['image']
+                self.assertTrue(error.startswith(message))
+                normalize.assert_not_called()
+        self.assertFalse(Post.objects.exists())
+
+    def test_dedupe_images(self):
+        """Команда оставляет один файл из копий и переводит на него посты"""
+        content = image_bytes()
+        names = [default_storage.save(f'posts/copy{i}.jpg',
+                                      ContentFile(content))
+                 for i in range(3)]
+        for name in names:
+            Post.objects.create(author=self.user, text='Копия', image=name)
+        out = StringIO()
+        call_command('dedupe_images', stdout=out)
+        self.assertIn('постов переведено: 2', out.getvalue())
+        self.assertEqual(
+            set(Post.objects.values_list('image', flat=True)), {names[0]})
+        self.assertFalse(default_storage.exists(names[1]))
@@ -73,6 +73,8 @@ class PostPagesTests(TestCase):
         ]
         for page in response:
             with self.subTest(page=page):
+                # карточка из кэша фрагментов не рендерится заново
+                cache.clear()
                 post = self.guest_client.get(page).context.get("post")
                 self.assert_post(post)
 
@@ -135,16 +137,15 @@ class PostPagesTests(TestCase):
                                 group=self.post.group).exists())
 
     def test_cach(self):
-        """Проверка cach"""
-        response = self.guest_client.get(reverse("posts:index"))
-        first_resp = response.content
+        """Проверка cach: страница берётся из кэша до изменения постов"""
+        first_resp = self.guest_client.get(reverse("posts:index"))
+        cached_resp = self.guest_client.get(reverse("posts:index"))
+        self.assertIsNone(cached_resp.context)
+        self.assertEqual(first_resp.content, cached_resp.content)
         Post.objects.get(id=1).delete()
-        response_second = self.guest_client.get(reverse("posts:index"))
-        second_resp = response_second.content
-        cache.clear()
-        after_clear = response_second.content
-        self.assertEqual(first_resp, second_resp)
-        self.assertNotEqual(response_second, after_clear)
+        after_delete = self.guest_client.get(reverse("posts:index"))
+        self.assertNotEqual(first_resp.content, after_delete.content)
+        self.assertNotContains(after_delete, self.post.text)
 
     def assert_post(self, post):
         self.assertEqual(self.post.text, post.text)
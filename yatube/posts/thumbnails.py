@@ -0,0 +1,246 @@
+"""Заранее подготовленные миниатюры картинок постов.
+
+Миниатюры всех размеров из THUMBNAIL_GEOMETRIES рендерит задача
+очереди core.jobs, поставленная при сохранении поста с картинкой, а
+шаблоны только читают готовый URL. Пока миниатюры нет, отдаётся
+исходная картинка.
+
+Для srcset каждый размер готовится ещё в ширинах THUMBNAIL_WIDTHS и
+в форматах THUMBNAIL_FORMATS, которые умеет Pillow; все варианты
+картинки рендерятся параллельно.
+
+URL миниатюр лежат в общем файле SQLite (core.kvstore), который
+видят все воркеры и который переживает перезапуск; для страницы
+постов они подгружаются одним запросом через preload().
+"""
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from django.utils import timezone
+from PIL import Image
+from sorl.thumbnail import get_thumbnail
+
+from core import jobs
+from core.kvstore import store
+from yatube.settings import (THUMBNAIL_FORMATS, THUMBNAIL_GEOMETRIES,
+                             THUMBNAIL_MEMO_SIZE, THUMBNAIL_SIZES,
+                             THUMBNAIL_WIDTHS, THUMBNAIL_WORKERS)
+
+from . import page_cache, timelines
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# метрики копятся в процессе и сбрасываются в хранилище пачками
+METRICS_FLUSH_EVERY = 100
+
+MIME_TYPES = {'AVIF': 'image/avif', 'WEBP': 'image/webp',
+              'JPEG': 'image/jpeg'}
+
+
+def _formats():
+    Image.init()
+    return [format for format in THUMBNAIL_FORMATS if format in Image.SAVE]
+
+
+# запасной JPEG всегда последний
+FORMATS = [*_formats(), 'JPEG']
+
+_lock = threading.Lock()
+_memo = {}
+_pending = Counter()
+
+
+def _record(**values):
+    with _lock:
+        _pending.update(values)
+        if sum(_pending.values()) < METRICS_FLUSH_EVERY:
+            return
+        flushed = dict(_pending)
+        _pending.clear()
+    store().add_metrics(flushed)
+
+
+def flush_metrics():
+    with _lock:
+        flushed = dict(_pending)
+        _pending.clear()
+    if flushed:
+        store().add_metrics(flushed)
+
+
+def _remember(urls):
+    with _lock:
+        if len(_memo) + len(urls) > THUMBNAIL_MEMO_SIZE:
+            _memo.clear()
+        _memo.update(urls)
+
+
+def url_key(name, alias):
+    return f'url||{alias}||{name}'
+
+
+def size(alias):
+    geometry = THUMBNAIL_GEOMETRIES[alias][0]
+    return tuple(map(int, geometry.split('x')))
+
+
+def widths(alias):
+    width = size(alias)[0]
+    return sorted({*(w for w in THUMBNAIL_WIDTHS if w < width), width})
+
+
+def variant_alias(alias, width, format):
+    return f'{alias}@{width}.{format.lower()}'
+
+
+def variants(alias):
+    """Варианты размера: (имя варианта, ширина, формат, геометрия, опции)."""
+    geometry, options = THUMBNAIL_GEOMETRIES[alias]
+    width, height = size(alias)
+    for variant_width in widths(alias):
+        variant_height = round(height * variant_width / width)
+        for format in FORMATS:
+            yield (variant_alias(alias, variant_width, format),
+                   variant_width, format,
+                   f'{variant_width}x{variant_height}',
+                   {**options, 'format': format})
+
+
+def url_keys(name):
+    """Все ключи URL миниатюр картинки."""
+    return [
+        key
+        for alias in THUMBNAIL_GEOMETRIES
+        for key in [url_key(name, alias)] + [
+            url_key(name, variant[0]) for variant in variants(alias)]
+    ]
+
+
+def preload(names):
+    """Подгружает URL миниатюр для набора картинок одним запросом."""
+    keys = [key for name in names if name for key in url_keys(name)]
+    missing = [key for key in keys if key not in _memo]
+    if missing:
+        _remember(store().get_many(missing))
+
+
+def find_url(key):
+    """URL по ключу из памяти процесса или общего хранилища."""
+    url = _memo.get(key)
+    if url is None:
+        url = store().get(key)
+        if url is not None:
+            _remember({key: url})
+    return url
+
+
+def get_url(image, alias):
+    """URL готовой миниатюры или исходной картинки, если её ещё нет."""
+    url = find_url(url_key(image.name, alias))
+    if url is None:
+        _record(misses=1)
+        return image.url
+    _record(hits=1)
+    return url
+
+
+def picture(image, alias, sizes=None):
+    """Данные для <picture>: srcset по форматам и запасная картинка.
+
+    Пока готовы не все варианты, srcset не отдаётся, и браузер
+    получает то же, что вернул бы get_url.
+    """
+    preload([image.name])
+    context = {'src': get_url(image, alias), 'sources': [], 'srcset': '',
+               'sizes': sizes or THUMBNAIL_SIZES.get(alias, '100vw')}
+    sources = []
+    for format in FORMATS:
+        candidates = []
+        for width in widths(alias):
+            url = find_url(
+                url_key(image.name, variant_alias(alias, width, format)))
+            if url is None:
+                return context
+            candidates.append(f'{url} {width}w')
+        sources.append((MIME_TYPES[format], ', '.join(candidates)))
+    *context['sources'], (_, context['srcset']) = sources
+    context['width'], context['height'] = size(alias)
+    return context
+
+
+def _render(name, variant):
+    alias, width, format, geometry, options = variant
+    return alias, get_thumbnail(name, geometry, **options).url
+
+
+def generate(name):
+    """Параллельно рендерит все варианты картинки и запоминает URL."""
+    if not default_storage.exists(name):
+        return {}
+    started = time.monotonic()
+    batch = [variant for alias in THUMBNAIL_GEOMETRIES
+             for variant in variants(alias)]
+    with ThreadPoolExecutor(THUMBNAIL_WORKERS) as pool:
+        rendered = dict(pool.map(lambda variant: _render(name, variant),
+                                 batch))
+    urls = {url_key(name, alias): url for alias, url in rendered.items()}
+    for alias in THUMBNAIL_GEOMETRIES:
+        # основной URL размера — самый широкий запасной JPEG
+        urls[url_key(name, alias)] = rendered[
+            variant_alias(alias, size(alias)[0], FORMATS[-1])]
+    store().set_many(urls)
+    _remember(urls)
+    _record(generated=len(batch),
+            generation_seconds=time.monotonic() - started)
+    return urls
+
+
+def stats():
+    flush_metrics()
+    metrics = store().metrics()
+    hits = metrics.get('hits', 0)
+    misses = metrics.get('misses', 0)
+    generated = metrics.get('generated', 0)
+    seconds = metrics.get('generation_seconds', 0)
+    return {
+        'hits': int(hits),
+        'misses': int(misses),
+        'hit_ratio': hits / (hits + misses) if hits + misses else 0.0,
+        'generated': int(generated),
+        'avg_generation_ms': 1000 * seconds / generated if generated else 0,
+    }
+
+
+@jobs.task('posts.thumbnails')
+def process_post(post_id):
+    """Готовит миниатюры поста и сбрасывает закэшированную разметку."""
+    post = Post.objects.select_related('author').filter(pk=post_id).first()
+    if post is None or not post.image:
+        return
+    if generate(post.image.name):
+        # новая отметка изменения даёт карточке поста новый ключ
+        Post.objects.filter(pk=post.pk).update(updated=timezone.now())
+        page_cache.bump_post(post, post.group_id)
+        timelines.bump_follow_pages(post.author_id)
+
+
+def process_post_safely(post_id):
+    try:
+        process_post(post_id)
+    except Exception:
+        logger.exception('Не удалось подготовить миниатюры поста %s',
+                         post_id)
+    finally:
+        close_old_connections()
+
+
+def schedule(post):
+    """Ставит подготовку миниатюр новой картинки поста в очередь."""
+    jobs.enqueue('posts.thumbnails', post.pk,
+                 key=f'thumbnails:{post.pk}:{post.image.name}')
@@ -0,0 +1,136 @@
+"""Материализованные ленты подписок (fan-out on write).
+
+Новый пост сразу раскладывается по лентам подписчиков автора,
+поэтому страница follow_index читает готовую ленту одним
+диапазоном по индексу (user, pub_date) вместо join с Follow. Если
+подписчиков больше TIMELINE_SYNC_FANOUT, рассылка уходит в очередь
+задач core.jobs, чтобы не задерживать ответ автору. Кэш страницы
+ленты сбрасывается вместе с каждой записанной пачкой, а не в запросе
+автора: иначе страница, прочитанная до выполнения задачи, осталась бы
+в кэше без нового поста.
+"""
+from django.db import transaction
+
+from core import jobs
+from yatube.settings import (TIMELINE_BATCH_SIZE, TIMELINE_DEPTH,
+                             TIMELINE_SYNC_FANOUT)
+
+from . import counters, page_cache
+from .models import Follow, Post, TimelineEntry
+
+
+def _insert(entries):
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=TIMELINE_BATCH_SIZE, ignore_conflicts=True)
+
+
+def _bump_pages(user_ids):
+    page_cache.bump(*[page_cache.follow_scope(user_id)
+                      for user_id in user_ids])
+
+
+def iter_follower_ids(author_id):
+    """Потоково отдаёт id подписчиков автора, не загружая их все."""
+    return (
+        Follow.objects.filter(author_id=author_id)
+        .order_by()
+        .values_list('user_id', flat=True)
+        .iterator(chunk_size=TIMELINE_BATCH_SIZE)
+    )
+
+
+def push_post(post):
+    """Добавляет новый пост в ленты всех подписчиков автора."""
+    followers = counters.get(counters.FOLLOWERS, post.author_id)
+    if followers > TIMELINE_SYNC_FANOUT:
+        jobs.enqueue('posts.push_post', post.pk, key=f'push_post:{post.pk}')
+    elif followers:
+        fan_out(post.pk, post.author_id, post.pub_date)
+
+
+@jobs.task('posts.push_post')
+def fan_out(post_id, author_id=None, pub_date=None):
+    """Раскладывает пост по лентам подписчиков пачками."""
+    if author_id is None:
+        post = Post.objects.filter(pk=post_id).values_list(
+            'author_id', 'pub_date').first()
+        if post is None:
+            return
+        author_id, pub_date = post
+    batch = []
+    for user_id in iter_follower_ids(author_id):
+        batch.append(TimelineEntry(
+            user_id=user_id, post_id=post_id, pub_date=pub_date))
+        if len(batch) >= TIMELINE_BATCH_SIZE:
+            _insert(batch)
+            _bump_pages(entry.user_id for entry in batch)
+            batch = []
+    if batch:
+        _insert(batch)
+        _bump_pages(entry.user_id for entry in batch)
+
+
+@jobs.task('posts.bump_follow_pages')
+def reset_follow_pages(author_id):
+    batch = []
+    for user_id in iter_follower_ids(author_id):
+        batch.append(user_id)
+        if len(batch) >= TIMELINE_BATCH_SIZE:
+            _bump_pages(batch)
+            batch = []
+    _bump_pages(batch)
+
+
+def bump_follow_pages(author_id):
+    """Сбрасывает кэш лент подписок всех подписчиков автора после
+    правки или удаления поста; большие рассылки уходят в очередь."""
+    followers = counters.get(counters.FOLLOWERS, author_id)
+    if followers > TIMELINE_SYNC_FANOUT:
+        jobs.enqueue('posts.bump_follow_pages', author_id)
+    elif followers:
+        reset_follow_pages(author_id)
+
+
+def trim(user_id):
+    """Обрезает ленту пользователя до TIMELINE_DEPTH записей."""
+    cutoff = list(
+        TimelineEntry.objects.filter(user_id=user_id)
+        .values_list('pub_date', flat=True)[TIMELINE_DEPTH:
+                                            TIMELINE_DEPTH + 1]
+    )
+    if cutoff:
+        TimelineEntry.objects.filter(
+            user_id=user_id, pub_date__lte=cutoff[0]).delete()
+
+
+def backfill(user_id, author_id):
+    """Дописывает в ленту последние посты автора после подписки."""
+    posts = (
+        Post.objects.filter(author_id=author_id)
+        .values_list('pk', 'pub_date')[:TIMELINE_DEPTH]
+    )
+    _insert([
+        TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+        for pk, pub_date in posts
+    ])
+    trim(user_id)
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты посты автора после отписки."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id).delete()
+
+
+def rebuild(user_id):
+    """Пересобирает ленту пользователя с нуля."""
+    posts = (
+        Post.objects.filter(author__following__user_id=user_id)
+        .values_list('pk', 'pub_date')[:TIMELINE_DEPTH]
+    )
+    with transaction.atomic():
+        TimelineEntry.objects.filter(user_id=user_id).delete()
+        _insert([
+            TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+            for pk, pub_date in posts
+        ])
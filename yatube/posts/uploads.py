@@ -0,0 +1,132 @@
+"""Приём картинок постов.
+
+HashingUploadHandler пишет загрузку на диск кусками и по пути считает
+SHA-256; байты сверх IMAGE_MAX_BYTES он не сохраняет. Форма проверяет
+размер и число пикселей по заголовку, ещё не декодируя картинку, затем
+перекодирует её без EXIF в JPEG (PNG для прозрачных) не больше
+IMAGE_MAX_SIDE по большей стороне.
+
+Файл называется хэшем загруженных байтов, поэтому повторная загрузка
+той же картинки не декодируется заново и не занимает места.
+"""
+import hashlib
+import io
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+from yatube.settings import (IMAGE_JPEG_QUALITY, IMAGE_MAX_BYTES,
+                             IMAGE_MAX_PIXELS, IMAGE_MAX_SIDE)
+
+from .models import Post
+
+UPLOAD_TO = Post._meta.get_field('image').upload_to
+# расширения, в которые перекодируются картинки
+FORMATS = {'.jpg': 'JPEG', '.png': 'PNG'}
+
+
+class HashingUploadHandler(TemporaryFileUploadHandler):
+    """Пишет загрузку во временный файл и считает её SHA-256."""
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.sha256 = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.sha256.update(raw_data)
+        if start + len(raw_data) > IMAGE_MAX_BYTES:
+            # слишком большой файл всё равно будет отклонён
+            return None
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.sha256 = self.sha256.hexdigest()
+        return file
+
+
+def digest(file):
+    sha256 = getattr(file, 'sha256', None)
+    if sha256 is None:
+        hasher = hashlib.sha256()
+        for chunk in file.chunks():
+            hasher.update(chunk)
+        sha256 = hasher.hexdigest()
+        file.seek(0)
+    return sha256
+
+
+def precheck(file):
+    """Ошибка загрузки, найденная без декодирования, или None."""
+    if file.size > IMAGE_MAX_BYTES:
+        return (f'Файл больше {filesizeformat(IMAGE_MAX_BYTES)}: '
+                f'{filesizeformat(file.size)}')
+    try:
+        # open читает только заголовок
+        width, height = Image.open(file).size
+    except Exception:
+        # битый файл отклонит сам ImageField
+        return None
+    finally:
+        file.seek(0)
+    if width * height > IMAGE_MAX_PIXELS:
+        return (f'Слишком большая картинка: {width}×{height}, '
+                f'допустимо не больше {IMAGE_MAX_PIXELS} пикселей')
+    return None
+
+
+def existing_name(sha256):
+    """Уже сохранённый файл с тем же содержимым."""
+    base = f'{UPLOAD_TO}{sha256[:2]}/{sha256}'
+    for extension in FORMATS:
+        if default_storage.exists(base + extension):
+            return base + extension
+    return None
+
+
+def _has_alpha(image):
+    if image.mode in ('RGBA', 'LA') or 'transparency' in image.info:
+        alpha = image.convert('RGBA').getchannel('A')
+        return alpha.getextrema()[0] < 255
+    return False
+
+
+def normalize(file):
+    """Перекодированная картинка без метаданных: (расширение, байты)."""
+    image = Image.open(file)
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((IMAGE_MAX_SIDE, IMAGE_MAX_SIDE))
+    output = io.BytesIO()
+    if _has_alpha(image):
+        extension = '.png'
+        image.convert('RGBA').save(output, FORMATS[extension],
+                                   optimize=True)
+    else:
+        extension = '.jpg'
+        image.convert('RGB').save(
+            output, FORMATS[extension], quality=IMAGE_JPEG_QUALITY,
+            optimize=True, progressive=True)
+    file.seek(0)
+    return extension, output.getvalue()
+
+
+class PreparedImage:
+    """Загрузка, готовая к сохранению под адресом своего содержимого."""
+
+    def __init__(self, file):
+        self.sha256 = digest(file)
+        self.name = existing_name(self.sha256)
+        self.content = None
+        if self.name is None:
+            extension, self.content = normalize(file)
+            self.name = (f'{UPLOAD_TO}{self.sha256[:2]}/'
+                         f'{self.sha256}{extension}')
+
+    def store(self):
+        """Сохраняет файл, если его ещё нет, и возвращает имя."""
+        if self.content is None or default_storage.exists(self.name):
+            return self.name
+        return default_storage.save(self.name, ContentFile(self.content))
@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 app_name = "posts"
 
@@ -9,11 +9,28 @@ urlpatterns = [
     path("group/<slug:slug>/", views.group_posts, name="group_list"),
     path("profile/<str:username>/", views.profile, name="profile"),
     path("posts/<int:post_id>/", views.post_detail, name="post_detail"),
+    path("posts/<int:post_id>/comments/", views.post_comments,
+         name="post_comments"),
+    path("search/", views.search, name="search"),
     path("create/", views.post_create, name="post_create"),
     path("posts/<int:post_id>/edit/", views.post_edit, name="post_edit"),
     path("posts/<int:post_id>/comment/", views.add_comment,
          name="add_comment"),
     path("follow/", views.follow_index, name="follow_index"),
+    path("api/posts/", api.index, name="api_index"),
+    path("api/group/<slug:slug>/", api.group_posts, name="api_group_list"),
+    path("api/profile/<str:username>/", api.profile, name="api_profile"),
+    path("api/posts/<int:post_id>/", api.post_detail,
+         name="api_post_detail"),
+    path("api/follow/", api.follow_index, name="api_follow_index"),
+    path("api/notifications/", api.notification_list,
+         name="api_notifications"),
+    path("api/notifications/unread/", api.notification_unread,
+         name="api_notifications_unread"),
+    path("api/notifications/read/", api.notification_read,
+         name="api_notifications_read"),
+    path("api/notifications/clear/", api.notification_clear,
+         name="api_notifications_clear"),
     path(
         "profile/<str:username>/follow/",
         views.profile_follow,
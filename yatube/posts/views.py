@@ -1,27 +1,38 @@
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 
 from yatube.settings import MAX_POSTS
 
+from . import api, counters, feeds, follows, page_cache, search as search_index
+from .conditional import (conditional_page, follow_state, group_state,
+                          index_state, post_state, profile_state)
 from .forms import PostForm, CommentForm
 from .models import Group, Post, User, Follow
-from django.views.decorators.cache import cache_page
+from .paginators import CursorPaginator
 
 
-def paginator(posts, request):
-    paginator = Paginator(posts, MAX_POSTS)
+def paginator(posts, request, count=None, order=feeds.FEED_ORDER):
+    paginator = CursorPaginator(posts, MAX_POSTS, count=count, **order)
+    cursor = request.GET.get('cursor')
     page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    if page_number and not cursor:
+        # старые ссылки ?page=N
+        page_obj = paginator.get_page(page_number)
+    else:
+        page_obj = paginator.get_cursor_page(cursor)
     return {
         'page_obj': page_obj,
     }
 
 
-@cache_page(20, cache='default', key_prefix='index_page')
+@conditional_page(index_state)
+@page_cache.cached_page(lambda request: page_cache.INDEX)
 def index(request):
     title = "Последние обновления на сайте"
-    posts = Post.objects.select_related('author', 'group')
+    posts = feeds.index_posts()
     context = {
         'title': title,
     }
@@ -29,36 +40,45 @@ def index(request):
     return render(request, "posts/index.html", context)
 
 
+@conditional_page(group_state)
+@page_cache.cached_page(
+    lambda request, slug: page_cache.group_scope(slug))
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.select_related('author')
+    posts = feeds.group_posts(group)
     context = {
         'group': group,
         'title': f"Записи сообщества {group}",
     }
-    context.update(paginator(posts, request))
+    count = counters.get(counters.GROUP_POSTS, group.pk)
+    context.update(paginator(posts, request, count))
     return render(request, "posts/group_list.html", context)
 
 
+@conditional_page(profile_state)
+@page_cache.cached_page(
+    lambda request, username: page_cache.profile_scope(username))
 def profile(request, username):
     author = get_object_or_404(User, username=username)
-    posts = author.posts.select_related('group')
-    following = author.following.exists()
+    posts = feeds.profile_posts(author)
+    following = follows.is_following(request.user, author.pk)
     context = {
         'author': author,
         'title': f"Профайл пользователя {author}",
         'posts': posts,
         'following': following,
     }
-    context.update(paginator(posts, request))
+    count = counters.get(counters.AUTHOR_POSTS, author.pk)
+    context.update(paginator(posts, request, count))
     return render(request, "posts/profile.html", context)
 
 
+@conditional_page(post_state)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    posts_count = post.author.posts.count()
+    post = get_object_or_404(feeds.detail_posts(), id=post_id)
+    posts_count = counters.get(counters.AUTHOR_POSTS, post.author_id)
     form = CommentForm()
-    comments = post.comments.all()
+    comments = feeds.comments_page(post, request.GET.get('comments'))
     context = {
         'post': post,
         'title': f"Пост: { post }",
@@ -69,9 +89,48 @@ def post_detail(request, post_id):
     return render(request, "posts/post_detail.html", context)
 
 
+@conditional_page(post_state)
+@page_cache.cached_page(
+    lambda request, post_id: page_cache.post_scope(post_id))
+def post_comments(request, post_id):
+    """Следующая страница комментариев: HTML-фрагмент или JSON"""
+    post = get_object_or_404(Post, id=post_id)
+    comments = feeds.comments_page(post, request.GET.get('cursor'))
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [api.serialize_comment(comment)
+                         for comment in comments],
+            'next_cursor': comments.next_cursor if comments.has_next() else '',
+        })
+    context = {
+        'post': post,
+        'comments': comments,
+    }
+    return render(request, "includes/comments_page.html", context)
+
+
+def search(request):
+    """Поиск по постам и комментариям"""
+    query = request.GET.get('q', '').strip()
+    post_ids = search_index.search(query) if query else []
+    page_obj = Paginator(post_ids, MAX_POSTS).get_page(
+        request.GET.get('page'))
+    posts = Post.objects.select_related('author', 'group').in_bulk(
+        page_obj.object_list)
+    page_obj.object_list = [
+        posts[pk] for pk in page_obj.object_list if pk in posts]
+    context = {
+        'title': f"Поиск: {query}" if query else "Поиск",
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, "posts/search.html", context)
+
+
 @login_required
+@transaction.atomic
 def post_create(request):
-    form = PostForm(request.POST or None)
+    form = PostForm(request.POST or None, files=request.FILES or None)
     if form.is_valid():
         new_post = form.save(commit=False)
         new_post.author = request.user
@@ -81,6 +140,7 @@ def post_create(request):
 
 
 @login_required
+@transaction.atomic
 def post_edit(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = PostForm(request.POST or None, instance=post)
@@ -105,6 +165,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
@@ -117,15 +178,18 @@ def add_comment(request, post_id):
 
 
 @login_required
+@conditional_page(follow_state)
+@page_cache.cached_page(
+    lambda request: page_cache.follow_scope(request.user.pk))
 def follow_index(request):
-    posts = Post.objects.select_related('author', 'group').filter(
-        author__following__user=request.user)
+    posts = feeds.follow_posts(request.user)
     context = {'title': "Лента подписок"}
-    context.update(paginator(posts, request))
+    context.update(paginator(posts, request, order=feeds.FOLLOW_ORDER))
     return render(request, "posts/follow.html", context)
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     """Подписаться на автора"""
     author = get_object_or_404(User, username=username)
@@ -135,6 +199,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     """Отписаться"""
     author = get_object_or_404(User, username=username)
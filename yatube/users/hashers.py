@@ -0,0 +1,25 @@
+"""Хэшеры паролей со стоимостью из настроек.
+
+Имена алгоритмов те же, что у хэшеров Django, поэтому старые хэши
+проверяются как прежде. Если стоимость в настройках изменилась,
+must_update заставит Django перехэшировать пароль при следующем входе.
+"""
+from django.contrib.auth import hashers
+
+from yatube.settings import (ARGON2_MEMORY_COST, ARGON2_PARALLELISM,
+                             ARGON2_TIME_COST, BCRYPT_ROUNDS,
+                             PBKDF2_ITERATIONS)
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    iterations = PBKDF2_ITERATIONS
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    time_cost = ARGON2_TIME_COST
+    memory_cost = ARGON2_MEMORY_COST
+    parallelism = ARGON2_PARALLELISM
+
+
+class BCryptSHA256PasswordHasher(hashers.BCryptSHA256PasswordHasher):
+    rounds = BCRYPT_ROUNDS
@@ -0,0 +1,88 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.utils.crypto import get_random_string
+from django.utils.module_loading import import_string
+
+from yatube.settings import HASHER_CLASSES, PASSWORD_HASHER
+
+# параметр стоимости каждого хэшера
+COST_FIELDS = {
+    'pbkdf2': 'iterations',
+    'argon2': 'time_cost',
+    'bcrypt': 'rounds',
+}
+
+
+def default_costs(name, current):
+    if name == 'pbkdf2':
+        costs = (current // 4, current // 2, current, current * 2)
+    elif name == 'bcrypt':
+        costs = (current - 2, current - 1, current, current + 1)
+    else:
+        costs = (current - 1, current, current + 1, current * 2)
+    return sorted({cost for cost in costs if cost > 0})
+
+
+class Command(BaseCommand):
+    help = ('Меряет, сколько стоит проверка пароля каждым хэшером при '
+            'разной стоимости и сколько входов в секунду это даёт')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hasher', action='append',
+                            choices=sorted(HASHER_CLASSES),
+                            help='По умолчанию все установленные')
+        parser.add_argument('--costs',
+                            help='Стоимости через запятую вместо '
+                                 'подобранных от текущей')
+        parser.add_argument('--samples', type=int, default=5)
+        parser.add_argument('--threads', type=int, default=4,
+                            help='Потоков для замера пропускной '
+                                 'способности')
+
+    def handle(self, *args, **options):
+        password = get_random_string(16)
+        for name in options['hasher'] or HASHER_CLASSES:
+            hasher = import_string(HASHER_CLASSES[name])()
+            if hasher.library:
+                try:
+                    hasher._load_library()
+                except ValueError as error:
+                    self.stdout.write(f'{name}: пропущен, {error}')
+                    continue
+            field = COST_FIELDS[name]
+            current = getattr(hasher, field)
+            if options['costs']:
+                costs = [int(cost) for cost in options['costs'].split(',')]
+            else:
+                costs = default_costs(name, current)
+            for cost in costs:
+                setattr(hasher, field, cost)
+                latency, throughput = self.measure(hasher, password,
+                                                   options)
+                mark = '*' if (name, cost) == (PASSWORD_HASHER,
+                                               current) else ' '
+                self.stdout.write(
+                    f'{mark}{name} {field}={cost}: проверка '
+                    f'{1000 * latency:.1f} мс, входов в секунду '
+                    f'{1 / latency:.1f} на ядро, {throughput:.1f} '
+                    f'в {options["threads"]} потоках')
+
+    def measure(self, hasher, password, options):
+        """Медиана проверки пароля и входов в секунду в потоках."""
+        encoded = hasher.encode(password, hasher.salt())
+        timings = []
+        for _ in range(options['samples']):
+            started = time.perf_counter()
+            hasher.verify(password, encoded)
+            timings.append(time.perf_counter() - started)
+        checks = options['samples'] * options['threads']
+        with ThreadPoolExecutor(options['threads']) as pool:
+            started = time.perf_counter()
+            # хэшеры отпускают GIL, поэтому потоки работают параллельно
+            list(pool.map(lambda _: hasher.verify(password, encoded),
+                          range(checks)))
+            elapsed = time.perf_counter() - started
+        return statistics.median(timings), checks / elapsed
@@ -0,0 +1,10 @@
+from django.contrib.auth.signals import user_login_failed
+from django.dispatch import receiver
+
+from . import throttling
+
+
+@receiver(user_login_failed)
+def login_failed(sender, credentials, request=None, **kwargs):
+    if request is not None:
+        throttling.hit(request, credentials.get('username', ''))
@@ -1 +1,128 @@
-pass
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from . import hashers, throttling
+
+User = get_user_model()
+
+
+class LoginThrottlingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader',
+                                            password='right-password')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        # граница окна посреди теста уменьшила бы вес прошлых попыток
+        clock = mock.patch.object(throttling, 'time')
+        clock.start().time.return_value = 1000.0
+        self.addCleanup(clock.stop)
+
+    def login(self, username='reader', password='wrong-password', **extra):
+        return self.client.post(reverse('users:login'),
+                                {'username': username, 'password': password},
+                                **extra)
+
+    @mock.patch.object(throttling, 'LOGIN_THROTTLE_RATES',
+                       {'ip': (100, 60), 'pair': (3, 60),
+                        'username': (100, 60)})
+    def test_pair_is_throttled_without_hashing(self):
+        """После серии неудач вход отвечает 429 и не проверяет пароль"""
+        for _ in range(3):
+            self.assertEqual(self.login().status_code, 200)
+        with mock.patch('django.contrib.auth.forms.authenticate') as auth:
+            response = self.login(password='right-password')
+        auth.assert_not_called()
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertContains(response, 'Слишком много попыток', status_code=429)
+        # другое имя с того же адреса и то же имя с другого пускаются
+        self.assertEqual(self.login('someone').status_code, 200)
+        self.assertEqual(self.login(REMOTE_ADDR='10.0.0.2').status_code, 200)
+
+    @mock.patch.object(throttling, 'LOGIN_THROTTLE_RATES',
+                       {'ip': (3, 60), 'pair': (100, 60),
+                        'username': (100, 60)})
+    def test_ip_is_throttled_across_usernames(self):
+        """С одного адреса нельзя перебирать имена пользователей"""
+        for number in range(3):
+            self.login(f'user{number}')
+        self.assertEqual(self.login().status_code, 429)
+
+    @mock.patch.object(throttling, 'LOGIN_THROTTLE_RATES',
+                       {'ip': (100, 60), 'pair': (100, 60),
+                        'username': (3, 60)})
+    def test_username_ceiling_across_addresses(self):
+        """Имя запирается и при переборе с разных адресов"""
+        for number in range(3):
+            self.login(REMOTE_ADDR=f'10.0.0.{number}')
+        self.assertEqual(self.login(REMOTE_ADDR='10.0.1.1').status_code, 429)
+
+    def test_client_ip_behind_trusted_proxy(self):
+        """X-Forwarded-For читается только от доверенных прокси"""
+        request = mock.Mock(META={
+            'REMOTE_ADDR': '10.0.0.1',
+            'HTTP_X_FORWARDED_FOR': '1.1.1.1, 2.2.2.2, 10.0.0.2',
+        })
+        self.assertEqual(throttling.client_ip(request), '10.0.0.1')
+        with mock.patch.object(throttling, 'TRUSTED_PROXIES', ['10.0.0.0/8']):
+            self.assertEqual(throttling.client_ip(request), '2.2.2.2')
+
+    @mock.patch.object(throttling, 'LOGIN_THROTTLE_RATES',
+                       {'ip': (100, 60), 'pair': (3, 60),
+                        'username': (100, 60)})
+    def test_window_slides_and_success_resets(self):
+        """Старые неудачи выветриваются, успешный вход их сбрасывает"""
+        request = mock.Mock(META={'REMOTE_ADDR': '127.0.0.1'})
+        for _ in range(3):
+            throttling.hit(request, 'reader', now=30)
+        self.assertTrue(throttling.retry_after(request, 'reader', now=59))
+        # из прошлого отрезка в окне осталась половина: 1.5 < 3
+        self.assertEqual(throttling.retry_after(request, 'reader', now=90),
+                         0)
+        self.login()
+        self.login()
+        self.assertEqual(self.login(password='right-password').status_code,
+                         302)
+        for _ in range(2):
+            self.assertEqual(self.login().status_code, 200)
+
+
+class PasswordRehashTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_cost_change_rehashes_on_login(self):
+        """Пароль со старой стоимостью перехэшируется при входе"""
+        with mock.patch.object(hashers.PBKDF2PasswordHasher,
+                               'iterations', 1000):
+            user = User.objects.create_user(username='reader',
+                                            password='right-password')
+        self.assertIn('$1000$', user.password)
+        self.assertTrue(Client().login(username='reader',
+                                       password='right-password'))
+        user.refresh_from_db()
+        self.assertIn(f'${hashers.PBKDF2PasswordHasher.iterations}$',
+                      user.password)
+
+    @override_settings(PASSWORD_HASHERS=[
+        'users.hashers.PBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.MD5PasswordHasher',
+    ])
+    def test_other_algorithm_rehashes_on_login(self):
+        """Хэш старого алгоритма принимается и заменяется выбранным"""
+        user = User.objects.create(
+            username='reader',
+            password=make_password('right-password', hasher='md5'))
+        self.assertTrue(Client().login(username='reader',
+                                       password='right-password'))
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$'))
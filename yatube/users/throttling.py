@@ -0,0 +1,119 @@
+"""Ограничение неудачных входов.
+
+Вход блокируется по паре (IP, имя пользователя), чтобы чужие ошибки
+с других адресов не запирали владельца. Отдельно считаются все
+попытки с одного IP (перебор имён) и на одно имя со всех адресов —
+с куда более высоким потолком против распределённого перебора.
+
+Счёт идёт в скользящем окне: в кэше лежат счётчики текущего и
+прошлого отрезка длиной в окно, а прошлый учитывается с весом той его
+части, что ещё попадает в окно. Так хватает двух ключей на счётчик, и
+на границе отрезков лимит не удваивается.
+
+Счётчики должны быть общими для всех процессов, поэтому нужен общий
+CACHE_BACKEND: с LocMemCache каждый воркер считает сам, и лимиты
+умножаются на число воркеров.
+"""
+import hashlib
+import ipaddress
+import math
+import time
+
+from django.core.cache import cache
+
+from yatube.settings import LOGIN_THROTTLE_RATES, TRUSTED_PROXIES
+
+
+def _trusted(address):
+    try:
+        address = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(proxy, strict=False)
+               for proxy in TRUSTED_PROXIES)
+
+
+def client_ip(request):
+    """Адрес клиента с учётом X-Forwarded-For от доверенных прокси.
+
+    Цепочка читается справа, пока адрес принадлежит доверенному
+    прокси: левее него значения мог подставить сам клиент.
+    """
+    address = request.META.get('REMOTE_ADDR', '')
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+    hops = [hop.strip() for hop in forwarded.split(',') if hop.strip()]
+    while hops and _trusted(address):
+        address = hops.pop()
+    return address
+
+
+def _idents(request, username):
+    ip = client_ip(request)
+    idents = {'ip': ip}
+    if username:
+        username = username.lower()
+        idents['pair'] = f'{ip} {username}'
+        idents['username'] = username
+    return idents
+
+
+def _key(scope, ident, index):
+    # имя пользователя может содержать что угодно, в ключ идёт хэш
+    digest = hashlib.md5(ident.encode()).hexdigest()
+    return f'login_throttle:{scope}:{digest}:{index}'
+
+
+def _window(scope, now):
+    limit, period = LOGIN_THROTTLE_RATES[scope]
+    index, elapsed = divmod(now, period)
+    return limit, period, int(index), elapsed
+
+
+def retry_after(request, username, now=None):
+    """Через сколько секунд можно снова пробовать войти, или 0."""
+    now = time.time() if now is None else now
+    windows = {}
+    for scope, ident in _idents(request, username).items():
+        limit, period, index, elapsed = _window(scope, now)
+        windows[scope] = (ident, limit, period, index, elapsed)
+    keys = [_key(scope, ident, index - shift)
+            for scope, (ident, _, _, index, _) in windows.items()
+            for shift in (0, 1)]
+    values = cache.get_many(keys)
+    wait = 0
+    for scope, (ident, limit, period, index, elapsed) in windows.items():
+        current = values.get(_key(scope, ident, index), 0)
+        previous = values.get(_key(scope, ident, index - 1), 0)
+        weight = 1 - elapsed / period
+        if previous * weight + current < limit:
+            continue
+        # когда вес прошлого отрезка опустится ниже лимита
+        if current >= limit or not previous:
+            seconds = period - elapsed
+        else:
+            seconds = (1 - (limit - current) / previous) * period - elapsed
+        wait = max(wait, math.ceil(seconds) or 1)
+    return wait
+
+
+def hit(request, username, now=None):
+    """Засчитывает неудачную попытку входа."""
+    now = time.time() if now is None else now
+    for scope, ident in _idents(request, username).items():
+        _, period, index, _ = _window(scope, now)
+        key = _key(scope, ident, index)
+        # отрезок нужен ещё одно окно после своего конца
+        cache.add(key, 0, 2 * period)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, 2 * period)
+
+
+def reset(request, username, now=None):
+    """Забывает неудачи пары (IP, имя) после успешного входа."""
+    now = time.time() if now is None else now
+    _, _, index, _ = _window('pair', now)
+    ident = _idents(request, username)['pair']
+    cache.delete_many([_key('pair', ident, index - shift)
+                       for shift in (0, 1)])
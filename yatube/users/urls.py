@@ -1,4 +1,4 @@
-from django.contrib.auth.views import LoginView, LogoutView, PasswordChangeView
+from django.contrib.auth.views import LogoutView, PasswordChangeView
 from django.urls import path
 
 from . import views
@@ -9,8 +9,7 @@ urlpatterns = [
     path('signup/', views.SignUp.as_view(), name='signup'),
     path('logout/', LogoutView.as_view(template_name='users/logged_out.html'),
          name='logout'),
-    path('login/', LoginView.as_view(template_name='users/login.html'),
-         name='login'),
+    path('login/', views.LoginView.as_view(), name='login'),
     path('password-reset/', PasswordChangeView.as_view(
          template_name='users/reset_password.html'),
          name='password_reset')
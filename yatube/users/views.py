@@ -1,7 +1,9 @@
+from django.contrib.auth import views as auth_views
 from django.views.generic import CreateView
 
 from django.urls import reverse_lazy
 
+from . import throttling
 from .forms import CreationForm
 
 
@@ -9,3 +11,24 @@ class SignUp(CreateView):
     form_class = CreationForm
     success_url = reverse_lazy('posts:index')
     template_name = 'users/signup.html'
+
+
+class LoginView(auth_views.LoginView):
+    """Вход, который после серии неудач отвечает 429, не проверяя
+    пароль."""
+    template_name = 'users/login.html'
+
+    def post(self, request, *args, **kwargs):
+        wait = throttling.retry_after(request, request.POST.get('username'))
+        if not wait:
+            return super().post(request, *args, **kwargs)
+        response = self.render_to_response(self.get_context_data(
+            form=self.form_class(request),
+            throttled=f'Слишком много попыток входа. Попробуйте снова '
+                      f'через {wait} с.'), status=429)
+        response['Retry-After'] = str(wait)
+        return response
+
+    def form_valid(self, form):
+        throttling.reset(self.request, form.get_user().get_username())
+        return super().form_valid(form)
@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -50,6 +52,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ProfilingMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -85,12 +89,100 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+# DB_ENGINE=postgresql включает PostgreSQL, DB_POOL_SIZE > 0 — ещё и
+# пул соединений внутри процесса (core.backends.postgresql_pool); драйвер
+# ставится из requirements-postgresql.txt
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite3')
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 0))
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': ('core.backends.postgresql_pool' if DB_POOL_SIZE
+                       else 'django.db.backends.postgresql'),
+            'NAME': os.environ.get('DB_NAME', 'yatube'),
+            'USER': os.environ.get('DB_USER', 'yatube'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            # с пулом соединение возвращается в пул в конце запроса
+            'CONN_MAX_AGE': (0 if DB_POOL_SIZE else
+                             int(os.environ.get('DB_CONN_MAX_AGE', 60))),
+            'POOL': {
+                'MIN_SIZE': int(os.environ.get('DB_POOL_MIN_SIZE', 1)),
+                'MAX_SIZE': DB_POOL_SIZE,
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            # транзакции с BEGIN IMMEDIATE, см. core.backends.sqlite3
+            'ENGINE': 'core.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME',
+                                   os.path.join(BASE_DIR, 'db.sqlite3')),
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        }
+    }
+
+# реплики для чтения: DB_REPLICAS — хосты PostgreSQL или файлы SQLite
+# через запятую. Файлы SQLite заменяют реплику локально, их наполняет
+# команда sync_replicas
+DATABASE_REPLICAS = []
+for number, replica in enumerate(
+        filter(None, os.environ.get('DB_REPLICAS', '').split(','))):
+    alias = f'replica_{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST' if DB_ENGINE == 'postgresql' else 'NAME': replica.strip(),
+        'TEST': {'MIRROR': 'default'},
     }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# сколько секунд после своей записи пользователь читает с основной базы
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 10))
+
+# PRAGMA для каждого нового соединения SQLite (core.signals) и
+# BEGIN IMMEDIATE для транзакций
+SQLITE_TUNING = os.environ.get('SQLITE_TUNING', '1') == '1'
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+}
+
+
+# кэш: CACHE_BACKEND — путь к общему для процессов бэкенду Django
+# (например, django.core.cache.backends.memcached.PyLibMCCache),
+# CACHE_LOCATION — его адрес. По умолчанию у каждого процесса свой
+# LocMemCache
+LOCMEM_CACHE = 'django.core.cache.backends.locmem.LocMemCache'
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', LOCMEM_CACHE)
+SHARED_CACHE = CACHE_BACKEND != LOCMEM_CACHE
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    },
+    # сессии; SESSION_CACHE_LOCATION лучше указывать отдельным
+    # сервером, чтобы cache.clear() не разлогинивал всех
+    'sessions': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.environ.get(
+            'SESSION_CACHE_LOCATION',
+            os.environ.get('CACHE_LOCATION', '') if SHARED_CACHE
+            else 'sessions'),
+        'KEY_PREFIX': 'sessions',
+    },
 }
+# ключи, которые сбрасываются явно (страницы лент и их поколения,
+# непрочитанные уведомления, подписки), в общем кэше живут сутки.
+# Сброс в LocMemCache виден только своему процессу, поэтому там они
+# живут недолго
+RESET_TIMEOUT = 60 * 60 * 24 if SHARED_CACHE else 20
 
 
 # Password validation
@@ -111,6 +203,42 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# хэшер паролей: pbkdf2, argon2 (нужен argon2-cffi) или bcrypt (нужен
+# bcrypt). Остальные остаются в списке, чтобы принимать старые хэши:
+# при входе пароль перехэшируется выбранным хэшером, как и при смене
+# стоимости ниже. Подобрать её помогает команда benchmark_hashers
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'pbkdf2')
+HASHER_CLASSES = {
+    'pbkdf2': 'users.hashers.PBKDF2PasswordHasher',
+    'argon2': 'users.hashers.Argon2PasswordHasher',
+    'bcrypt': 'users.hashers.BCryptSHA256PasswordHasher',
+}
+PASSWORD_HASHERS = [HASHER_CLASSES[PASSWORD_HASHER]] + [
+    path for name, path in HASHER_CLASSES.items() if name != PASSWORD_HASHER
+] + ['django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher']
+PBKDF2_ITERATIONS = int(os.environ.get('PBKDF2_ITERATIONS', 150000))
+ARGON2_TIME_COST = int(os.environ.get('ARGON2_TIME_COST', 2))
+# в КиБ
+ARGON2_MEMORY_COST = int(os.environ.get('ARGON2_MEMORY_COST', 512))
+ARGON2_PARALLELISM = int(os.environ.get('ARGON2_PARALLELISM', 2))
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))
+
+# неудачные входы: (сколько попыток, за сколько секунд) с одного IP,
+# для пары IP и имени пользователя и на одно имя со всех адресов; окно
+# скользящее, счётчики лежат в кэше, поэтому нужен общий CACHE_BACKEND
+LOGIN_THROTTLE_RATES = {
+    'ip': (30, 5 * 60),
+    'pair': (5, 5 * 60),
+    'username': (50, 5 * 60),
+}
+
+# адреса и сети прокси через запятую, чьему X-Forwarded-For можно верить
+TRUSTED_PROXIES = [
+    proxy.strip()
+    for proxy in os.environ.get('TRUSTED_PROXIES', '').split(',')
+    if proxy.strip()
+]
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/2.2/topics/i18n/
@@ -135,12 +263,33 @@ STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
 
 MAX_POSTS = 10
 
+# комментариев на одной странице post_detail
+COMMENTS_PER_PAGE = 20
+
 LEN_OF_POSTS = 15
 
 POSTS_ON_PAGES_FIRST = 10
 
 POSTS_ON_PAGES_SECOND = 3
 
+# сколько лучших результатов поиска разбивать на страницы
+SEARCH_MAX_RESULTS = 1000
+
+# глубина материализованной ленты подписок
+TIMELINE_DEPTH = 1000
+
+TIMELINE_BATCH_SIZE = 1000
+
+# до скольки подписчиков пост раскладывается по лентам прямо в запросе;
+# большие рассылки уходят в очередь задач
+TIMELINE_SYNC_FANOUT = 500
+
+# до скольки подписчиков уведомления о посте пишутся прямо в запросе
+NOTIFICATION_SYNC_FANOUT = 500
+NOTIFICATION_BATCH_SIZE = 1000
+UNREAD_COUNT_TIMEOUT = RESET_TIMEOUT
+FOLLOWING_IDS_TIMEOUT = RESET_TIMEOUT
+
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index'
@@ -155,8 +304,93 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 CRSF_FAILURE_VIEW = 'core.views.csrf_failure'
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+PAGE_CACHE_TIMEOUT = RESET_TIMEOUT
+# поколения областей page_cache; без общего кэша они тоже устаревают,
+# иначе ETag страницы в другом процессе не сменился бы
+PAGE_GENERATION_TIMEOUT = None if SHARED_CACHE else RESET_TIMEOUT
+
+# карточка поста в ключе содержит дату изменения поста
+POST_CARD_TIMEOUT = 60 * 60 * 24
+
+# загрузки пишутся на диск кусками с подсчётом SHA-256 (posts.uploads)
+FILE_UPLOAD_HANDLERS = ['posts.uploads.HashingUploadHandler']
+# ограничения картинки поста: файл и число пикселей проверяются до
+# декодирования, большая сторона после перекодирования не больше
+# IMAGE_MAX_SIDE
+IMAGE_MAX_BYTES = 10 * 1024 * 1024
+IMAGE_MAX_PIXELS = 40 * 1000 * 1000
+IMAGE_MAX_SIDE = 2560
+IMAGE_JPEG_QUALITY = 85
+
+# размеры миниатюр, которые готовятся сразу после загрузки картинки
+THUMBNAIL_GEOMETRIES = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+
+# ширины адаптивных вариантов миниатюр для srcset; самая большая —
+# ширина из THUMBNAIL_GEOMETRIES
+THUMBNAIL_WIDTHS = (320, 640)
+# атрибут sizes: сколько места миниатюра занимает на странице
+THUMBNAIL_SIZES = {'card': '(min-width: 992px) 960px, 100vw'}
+# форматы вариантов в порядке предпочтения, кроме запасного JPEG;
+# берутся только те, которые умеет сохранять установленный Pillow
+THUMBNAIL_FORMATS = ('AVIF', 'WEBP')
+
+THUMBNAIL_WORKERS = 2
+
+# метаданные миниатюр в общем для всех процессов файле SQLite
+THUMBNAIL_KVSTORE = 'core.kvstore.ThumbnailKVStore'
+THUMBNAIL_KVSTORE_PATH = os.environ.get(
+    'THUMBNAIL_KVSTORE_PATH', os.path.join(BASE_DIR, 'thumbnails.sqlite3'))
+
+# на время тестов подменяет настройки, которые ведут в общие файлы
+# или включают выборочное профилирование
+TEST_RUNNER = 'core.testing.TestRunner'
+
+# сколько URL миниатюр держать в памяти процесса
+THUMBNAIL_MEMO_SIZE = 10000
+
+# хранилище сессий: cached_db читает из кэша и пишет ещё и в базу,
+# cache держит их только в кэше, signed_cookies — в подписанной
+# cookie, db — только в базе. Кэшу сессий нужен общий CACHE_BACKEND:
+# выход, удаливший сессию из кэша одного процесса, не разлогинил бы
+# остальные. Истёкшие сессии из базы удаляет команда prune_sessions
+SESSION_STORE = os.environ.get('SESSION_ENGINE',
+                               'cached_db' if SHARED_CACHE else 'db')
+if SESSION_STORE in ('cache', 'cached_db') and not SHARED_CACHE:
+    raise ImproperlyConfigured(
+        f'SESSION_ENGINE={SESSION_STORE} требует общего CACHE_BACKEND')
+SESSION_ENGINE = f'django.contrib.sessions.backends.{SESSION_STORE}'
+SESSION_CACHE_ALIAS = 'sessions'
+
+# очередь фоновых задач core.jobs, её разбирает команда run_jobs
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 4))
+JOB_MAX_ATTEMPTS = 5
+# задержка перед повтором удваивается с каждой попыткой
+JOB_BACKOFF_SECONDS = 10
+JOB_BACKOFF_MAX_SECONDS = 60 * 60
+# задача, которая выполняется дольше, считается потерянной
+JOB_TIMEOUT_SECONDS = 10 * 60
+JOB_POLL_SECONDS = 1
+# сколько дней хранить выполненные задачи и их ключи идемпотентности
+JOB_RETENTION_DAYS = 7
+
+# доля запросов, которые профилирует core.middleware.ProfilingMiddleware
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 0.01))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.profiling': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
 }